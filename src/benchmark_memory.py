@@ -0,0 +1,98 @@
+import os
+import gc
+import sys
+import time
+import argparse
+import tracemalloc
+
+from patching_script_general import parse_cfg, load_parsed_file
+
+GAMEDATA_REL = 'Content/GameLite/GameData'
+
+def make_synthetic_cfg(struct_count):
+    """Builds .cfg text shaped like the prototype files: refkey chains, nested blocks, arrays and typed values."""
+    lines = []
+    for i in range(struct_count):
+        header = "{refkey=[0]}" if i == 0 else f"{{refkey=SynthStruct_{i // 4}}}"
+        lines += [
+            f"SynthStruct_{i} : struct.begin {header}",
+            f"   SID = SynthStruct_{i}",
+            f"   Health = {100 + i % 50}",
+            f"   Weight = {1.5 + i % 7:.1f}f",
+            f"   Faction = EFaction::Faction{i % 12}",
+            f"   IsZombie = {'true' if i % 9 == 0 else 'false'}",
+            "   CombatParameters : struct.begin",
+            f"      AccuracyMultiplier = {0.5 + (i % 10) / 20:.2f}",
+            f"      MaxRange = {2000 + i % 30 * 100}",
+            "      BehaviorTypes : struct.begin",
+            "         Master : struct.begin",
+            f"            MinShots = {i % 5 + 1}",
+            f"            MaxShots = {i % 5 + 4}",
+            "            IgnoreDispersionChance = 25%",
+            "         struct.end",
+            "      struct.end",
+            "   struct.end",
+            "   Tags : struct.begin",
+            "      [*] = Human",
+            f"      [*] = Tag{i % 20}",
+            "   struct.end",
+            "struct.end",
+        ]
+    return "\n".join(lines) + "\n"
+
+def measure(build):
+    """Runs build() under tracemalloc and returns (result, bytes still allocated, seconds)."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+def count_nodes(root):
+    structs = len(root.children)
+    return structs, sum(1 for _ in root.walk()) - 1
+
+def benchmark_synthetic(struct_count):
+    text = make_synthetic_cfg(struct_count)
+    root, size, elapsed = measure(lambda: parse_cfg(text))
+    structs, nodes = count_nodes(root)
+    print(f"Synthetic dump: {structs} top-level structs, {nodes} nodes, {len(text) / 1e6:.1f} MB of text")
+    print(f"  parsed in {elapsed:.2f}s, {size / 1e6:.1f} MB retained")
+    print(f"  {size / structs:.0f} bytes per struct, {size / nodes:.0f} bytes per node")
+
+def benchmark_dump(source_dump):
+    abs_paths = []
+    for dirpath, _, files in os.walk(os.path.join(source_dump, GAMEDATA_REL)):
+        abs_paths += [os.path.join(dirpath, f) for f in sorted(files) if f.endswith('.cfg')]
+    if not abs_paths:
+        print(f"No .cfg files under {os.path.join(source_dump, GAMEDATA_REL)}")
+        return
+
+    parsed, size, elapsed = measure(lambda: [load_parsed_file(p) for p in abs_paths])
+    text_size = sum(sys.getsizeof(p.content) for p in parsed)
+    structs = nodes = 0
+    for p in parsed:
+        s, n = count_nodes(p.root)
+        structs += s
+        nodes += n
+    print(f"Dump {source_dump}: {len(parsed)} files, {structs} top-level structs, {nodes} nodes")
+    print(f"  loaded in {elapsed:.2f}s, {size / 1e6:.1f} MB retained ({text_size / 1e6:.1f} MB of it file text)")
+    print(f"  {(size - text_size) / max(structs, 1):.0f} bytes per struct excluding text")
+
+def main():
+    parser = argparse.ArgumentParser(description="Report how much memory parsed cfg trees take.")
+    parser.add_argument("--structs", type=int, default=20000, help="Top-level structs in the synthetic dump")
+    parser.add_argument("--dump", help="Also load every GameData file of a real dump (the Stalker2 folder)")
+    args = parser.parse_args()
+
+    benchmark_synthetic(args.structs)
+    if args.dump:
+        benchmark_dump(args.dump)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,6 @@
 import os
-import re
 import argparse
-from patching_script_general import get_struct_content, get_value
+from patching_script_general import iter_cfg_events, iter_top_level_structs, parse_value
 
 # --- PRESETS ---
 PRESETS = {
@@ -17,64 +16,53 @@ PRESETS = {
 
 # --- PARSERS ---
 
-def parse_weapons_attributes(content):
-    """Parses NPCWeaponAttributesPrototypes.cfg into a nested dictionary."""
+RANKS = ["Newbie", "Experienced", "Veteran", "Master", "Zombie"]
+BRACKETS = ["Short", "Medium", "Long"]
+ATTRIBUTE_PROPERTIES = ["MinShots", "MaxShots", "IgnoreDispersionMinShots", "IgnoreDispersionMaxShots"]
+SETTINGS_PROPERTIES = ["DispersionRadius", "BaseBleeding", "ChanceBleedingPerShot"]
+
+def parse_weapons_attributes(lines):
+    """
+    Parses NPCWeaponAttributesPrototypes.cfg into a nested dictionary.
+    Top-level structs are parsed one at a time, so `lines` can be an open file of any size.
+    """
     results = {}
-    # Find all top-level SIDs
-    sids = re.findall(r'^(\w+)\s*:\s*struct\.begin', content, re.MULTILINE)
-    
-    for sid in sids:
-        sid_content = get_struct_content(content, sid)
-        if not sid_content: continue
-        
-        results[sid] = {}
-        
-        bt_content = get_struct_content(sid_content, "BehaviorTypes")
-        if not bt_content: continue
-        
-        ranks = ["Newbie", "Experienced", "Veteran", "Master", "Zombie"]
-        
-        for rank in ranks:
-            rank_content = get_struct_content(bt_content, rank)
-            if not rank_content: 
-                # Ensure rank key exists even if empty, for matrix completeness
-                results[sid][rank] = {}
-                continue
-            
-            results[sid][rank] = {}
-            
-            brackets = ["Short", "Medium", "Long"]
-            for bracket in brackets:
-                br_content = get_struct_content(rank_content, bracket)
-                if not br_content: 
-                    results[sid][rank][bracket] = {}
+    for node in iter_top_level_structs(lines):
+        if node.name in results:
+            continue # a repeated SID only counts the first time
+        results[node.name] = {}
+
+        behavior_types = node.find("BehaviorTypes")
+        if behavior_types is None: continue
+
+        for rank in RANKS:
+            rank_node = behavior_types.child(rank)
+            # Ensure rank key exists even if empty, for matrix completeness
+            results[node.name][rank] = {}
+            if rank_node is None: continue
+
+            for bracket in BRACKETS:
+                bracket_node = rank_node.child(bracket)
+                if bracket_node is None:
+                    results[node.name][rank][bracket] = {}
                     continue
-                
-                results[sid][rank][bracket] = {
-                    "MinShots": get_value(br_content, "MinShots"),
-                    "MaxShots": get_value(br_content, "MaxShots"),
-                    "IgnoreDispersionMinShots": get_value(br_content, "IgnoreDispersionMinShots"),
-                    "IgnoreDispersionMaxShots": get_value(br_content, "IgnoreDispersionMaxShots")
-                }
+                results[node.name][rank][bracket] = {prop: bracket_node.get(prop) for prop in ATTRIBUTE_PROPERTIES}
     return results
 
-def parse_npc_weapon_settings(content):
+def parse_npc_weapon_settings(lines):
     """
     Parses NPCWeaponSettingsPrototypes.cfg.
     Extracts: DispersionRadius, BaseBleeding, ChanceBleedingPerShot
     """
     results = {}
-    sids = re.findall(r'^(\w+)\s*:\s*struct\.begin', content, re.MULTILINE)
-    
-    for sid in sids:
-        sid_content = get_struct_content(content, sid)
-        if not sid_content: continue
-        
-        results[sid] = {
-            "DispersionRadius": get_value(sid_content, "DispersionRadius"),
-            "BaseBleeding": get_value(sid_content, "BaseBleeding"),
-            "ChanceBleedingPerShot": get_value(sid_content, "ChanceBleedingPerShot")
-        }
+    sid = None
+    for event in iter_cfg_events(lines):
+        if event.kind == 'struct_begin' and event.depth == 0:
+            sid = event.name if event.name not in results else None
+            if sid:
+                results[sid] = {prop: None for prop in SETTINGS_PROPERTIES}
+        elif event.kind == 'property' and sid and event.name in results[sid] and results[sid][event.name] is None:
+            results[sid][event.name] = parse_value(event.value)
     return results
 
 
@@ -324,28 +312,26 @@ def process_comparison(orig_path, patch_path, type_hint, limit=None):
         print(f"Error: Patch file not found: {patch_path}")
         return []
 
+    if type_hint == "npc_weapon_settings":
+        parser = parse_npc_weapon_settings
+        comparator = get_settings_comparison_data
+    elif type_hint == "npc_weapon_attributes":
+        # Default or inferred
+        parser = parse_weapons_attributes
+        comparator = get_attributes_comparison_data
+    else:
+        print(f"Unknown type: {type_hint}")
+        return []
+
     print(f"Reading {os.path.basename(orig_path)}...")
     with open(orig_path, 'r', encoding='utf-8-sig') as f:
-        orig_content = f.read()
+        orig_data = parser(f)
         
     print(f"Reading {os.path.basename(patch_path)}...")
     with open(patch_path, 'r', encoding='utf-8-sig') as f:
-        patch_content = f.read()
+        patch_data = parser(f)
 
-    if type_hint == "npc_weapon_settings":
-        orig_data = parse_npc_weapon_settings(orig_content)
-        patch_data = parse_npc_weapon_settings(patch_content)
-        return get_settings_comparison_data(orig_data, patch_data, limit)
-    
-    elif type_hint == "npc_weapon_attributes":  
-        # Default or inferred
-        orig_data = parse_weapons_attributes(orig_content)
-        patch_data = parse_weapons_attributes(patch_content)
-        return get_attributes_comparison_data(orig_data, patch_data, limit)
-        
-    else:
-        print(f"Unknown type: {type_hint}")
-        return []
+    return comparator(orig_data, patch_data, limit)
 
 def main():
     parser = argparse.ArgumentParser(description="Compare STALKER 2 config files.")
@@ -0,0 +1,227 @@
+import os
+import sys
+import sqlite3
+import hashlib
+import argparse
+
+from patching_script_general import iter_cfg_events, parse_value, EnumRef
+
+GAMEDATA_REL = 'Content/GameLite/GameData'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    rel_path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha1 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS structs (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    sid TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    refkey TEXT,
+    refurl TEXT,
+    start INTEGER NOT NULL,
+    end INTEGER
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    struct_id INTEGER NOT NULL REFERENCES structs(id) ON DELETE CASCADE,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS properties (
+    struct_id INTEGER NOT NULL REFERENCES structs(id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    type TEXT NOT NULL,
+    num REAL
+);
+CREATE INDEX IF NOT EXISTS idx_structs_sid ON structs(sid);
+CREATE INDEX IF NOT EXISTS idx_structs_file ON structs(file_id);
+CREATE INDEX IF NOT EXISTS idx_nodes_struct ON nodes(struct_id);
+CREATE INDEX IF NOT EXISTS idx_properties_struct ON properties(struct_id);
+CREATE INDEX IF NOT EXISTS idx_properties_key ON properties(key);
+"""
+
+def value_type(value):
+    """Names the type parse_value produced, plus its numeric form for range queries."""
+    if isinstance(value, bool):
+        return 'bool', float(value)
+    if isinstance(value, int):
+        return 'int', float(value)
+    if isinstance(value, float):
+        return 'float', value
+    if isinstance(value, EnumRef):
+        return 'enum', None
+    return 'str', None
+
+class DumpCatalog:
+    """
+    SQLite index of every struct in a GameData dump: which file defines each SID, its
+    refkey/refurl, its nested node paths and every property with its type. Re-indexing only
+    touches files whose size, mtime or content changed.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def index_dump(self, source_dump, rel_root=GAMEDATA_REL):
+        """Indexes every .cfg under source_dump/rel_root. Returns (indexed, unchanged, removed) counts."""
+        seen = set()
+        indexed = unchanged = 0
+        for dirpath, _, files in os.walk(os.path.join(source_dump, rel_root)):
+            for name in sorted(files):
+                if not name.endswith('.cfg'):
+                    continue
+                abs_path = os.path.join(dirpath, name)
+                rel_path = os.path.relpath(abs_path, source_dump).replace('\\', '/')
+                seen.add(rel_path)
+                if self.index_file(abs_path, rel_path):
+                    indexed += 1
+                else:
+                    unchanged += 1
+
+        removed = 0
+        for file_id, rel_path in self.conn.execute("SELECT id, rel_path FROM files").fetchall():
+            if rel_path not in seen:
+                self.conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+                removed += 1
+        self.conn.commit()
+        return indexed, unchanged, removed
+
+    def index_file(self, abs_path, rel_path):
+        """(Re)indexes one file if it changed since the last run. Returns True if it was indexed."""
+        st = os.stat(abs_path)
+        row = self.conn.execute("SELECT id, size, mtime_ns, sha1 FROM files WHERE rel_path = ?", (rel_path,)).fetchone()
+        if row and row[1] == st.st_size and row[2] == st.st_mtime_ns:
+            return False
+
+        sha1 = hashlib.sha1()
+        with open(abs_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(chunk)
+        digest = sha1.hexdigest()
+        if row and row[3] == digest:
+            # Touched but not modified
+            self.conn.execute("UPDATE files SET mtime_ns = ? WHERE id = ?", (st.st_mtime_ns, row[0]))
+            return False
+
+        if row:
+            self.conn.execute("DELETE FROM files WHERE id = ?", (row[0],))
+        cur = self.conn.execute("INSERT INTO files (rel_path, size, mtime_ns, sha1) VALUES (?, ?, ?, ?)",
+                                (rel_path, st.st_size, st.st_mtime_ns, digest))
+        file_id = cur.lastrowid
+
+        stack = [] # (name, struct_id) of open structs
+        position = 0
+        with open(abs_path, 'r', encoding='utf-8-sig') as f:
+            for event in iter_cfg_events(f):
+                if event.kind == 'struct_begin':
+                    if event.depth == 0:
+                        refkey = event.value.get('refkey')
+                        refurl = event.value.get('refurl')
+                        cur = self.conn.execute(
+                            "INSERT INTO structs (file_id, sid, position, refkey, refurl, start) VALUES (?, ?, ?, ?, ?, ?)",
+                            (file_id, event.name, position, refkey if isinstance(refkey, str) else None,
+                             refurl if isinstance(refurl, str) else None, event.start))
+                        position += 1
+                        stack.append((event.name, cur.lastrowid))
+                    else:
+                        stack.append((event.name, stack[-1][1]))
+                        self.conn.execute("INSERT INTO nodes (struct_id, path) VALUES (?, ?)",
+                                          (stack[-1][1], "/".join(n for n, _ in stack)))
+                elif event.kind == 'struct_end':
+                    name, struct_id = stack.pop()
+                    if not stack:
+                        self.conn.execute("UPDATE structs SET end = ? WHERE id = ?", (event.end, struct_id))
+                elif event.kind in ('property', 'array_item') and stack:
+                    kind, num = value_type(parse_value(event.value))
+                    self.conn.execute(
+                        "INSERT INTO properties (struct_id, path, key, value, type, num) VALUES (?, ?, ?, ?, ?, ?)",
+                        (stack[-1][1], "/".join(n for n, _ in stack), event.name, event.value, kind, num))
+        return True
+
+    def find_files(self, sid):
+        """Returns the dump-relative paths of every file defining a top-level SID."""
+        rows = self.conn.execute(
+            "SELECT f.rel_path FROM structs s JOIN files f ON f.id = s.file_id WHERE s.sid = ? ORDER BY f.rel_path",
+            (sid,)).fetchall()
+        return [r[0] for r in rows]
+
+    def get_parent(self, sid):
+        """Returns (refkey, refurl) of the first definition of a SID, or None if it is unknown."""
+        return self.conn.execute("SELECT refkey, refurl FROM structs WHERE sid = ? ORDER BY id LIMIT 1",
+                                 (sid,)).fetchone()
+
+    def get_nodes(self, sid):
+        """Returns the nested struct paths of a SID, e.g. SID/AIParameters/BehaviorTypes."""
+        rows = self.conn.execute(
+            "SELECT n.path FROM nodes n JOIN structs s ON s.id = n.struct_id WHERE s.sid = ? ORDER BY n.rowid",
+            (sid,)).fetchall()
+        return [r[0] for r in rows]
+
+    def get_properties(self, sid, path=None):
+        """Returns (path, key, value, type) rows of a SID, optionally limited to one node path."""
+        query = ("SELECT p.path, p.key, p.value, p.type FROM properties p JOIN structs s ON s.id = p.struct_id "
+                 "WHERE s.sid = ?")
+        args = [sid]
+        if path is not None:
+            query += " AND p.path = ?"
+            args.append(path)
+        return self.conn.execute(query + " ORDER BY p.rowid", args).fetchall()
+
+    def find_by_property(self, key, min_value=None, max_value=None):
+        """Returns (rel_path, sid, path, value) rows where a numeric property falls in [min_value, max_value]."""
+        query = ("SELECT f.rel_path, s.sid, p.path, p.value FROM properties p JOIN structs s ON s.id = p.struct_id "
+                 "JOIN files f ON f.id = s.file_id WHERE p.key = ?")
+        args = [key]
+        if min_value is not None:
+            query += " AND p.num >= ?"
+            args.append(min_value)
+        if max_value is not None:
+            query += " AND p.num <= ?"
+            args.append(max_value)
+        return self.conn.execute(query, args).fetchall()
+
+def open_catalog(db_path):
+    """Opens an existing catalog, or returns None if it has not been built yet."""
+    if not db_path or not os.path.exists(db_path):
+        return None
+    return DumpCatalog(db_path)
+
+def main():
+    from patch_config import SOURCE_DUMP, CATALOG_DB
+
+    parser = argparse.ArgumentParser(description="Index a STALKER 2 cfg dump into SQLite and query it.")
+    parser.add_argument("--dump", default=SOURCE_DUMP, help="Source dump root (the Stalker2 folder)")
+    parser.add_argument("--db", default=CATALOG_DB, help="Catalog database path")
+    parser.add_argument("--find", metavar="SID", help="Print the files defining a SID instead of indexing")
+    parser.add_argument("--props", metavar="SID", help="Print the properties of a SID instead of indexing")
+    args = parser.parse_args()
+
+    catalog = DumpCatalog(args.db)
+    try:
+        if args.find:
+            for rel_path in catalog.find_files(args.find):
+                print(rel_path)
+        elif args.props:
+            for path, key, value, kind in catalog.get_properties(args.props):
+                print(f"{path}: {key} = {value} ({kind})")
+        else:
+            print(f"Indexing {args.dump} into {args.db}...")
+            indexed, unchanged, removed = catalog.index_dump(args.dump)
+            print(f"Indexed {indexed} files, {unchanged} unchanged, {removed} removed.")
+    finally:
+        catalog.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
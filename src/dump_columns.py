@@ -0,0 +1,229 @@
+import os
+import re
+import sys
+import struct
+import zipfile
+import argparse
+
+try:
+    import numpy as np
+except ImportError: # Optional: only this tool needs it
+    np = None
+
+import patching_script_general as psg
+
+_WHERE_RE = re.compile(r'^\s*(\w+)\s*(<=|>=|==|!=|<|>)\s*(-?[\d.]+(?:[eE][-+]?\d+)?)\s*$')
+_ZIP_LOCAL_HEADER_SIZE = 30
+
+class ColumnTable:
+    """
+    Numeric properties of a cfg file as columns: one row per SID or nested struct path
+    (e.g. SID/AIParameters/BehaviorTypes/Master), one float64 column per property name, and a
+    `present` mask telling which cells the struct actually defines (or inherits).
+    Both matrices are stored column-major so each property is one contiguous array.
+    """
+
+    def __init__(self, rows, columns, values, present):
+        self.rows = rows
+        self.columns = list(columns)
+        self.values = values
+        self.present = present
+        self._column_index = {name.lower(): j for j, name in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def column(self, name):
+        """Returns a property as a masked array over all rows; rows without it are masked."""
+        j = self._column_index.get(name.lower())
+        if j is None:
+            raise KeyError(f"No numeric property '{name}'")
+        return np.ma.MaskedArray(self.values[:, j], mask=~self.present[:, j])
+
+    def top_level(self):
+        """Mask of the rows that are SIDs rather than nested paths."""
+        return np.char.find(self.rows, '/') < 0
+
+    def select(self, mask):
+        """Returns the row names where a boolean (or masked boolean) array is true."""
+        if isinstance(mask, np.ma.MaskedArray):
+            mask = mask.filled(False)
+        return [str(r) for r in self.rows[np.asarray(mask, dtype=bool)]]
+
+    def mask(self, expr):
+        """Row mask of a `Name<op>number` filter such as CheckEnemyTime>30; rows without the property never match."""
+        m = _WHERE_RE.match(expr)
+        if not m:
+            raise ValueError(f"Bad filter '{expr}', expected e.g. CheckEnemyTime>30")
+        name, op, number = m.group(1), m.group(2), float(m.group(3))
+        col = self.column(name)
+        compare = {'<': col.__lt__, '<=': col.__le__, '>': col.__gt__, '>=': col.__ge__, '==': col.__eq__,
+                   '!=': col.__ne__}[op]
+        return compare(number).filled(False)
+
+    def where(self, *exprs):
+        """Row names matching every filter."""
+        mask = np.ones(len(self), dtype=bool)
+        for expr in exprs:
+            mask &= self.mask(expr)
+        return self.select(mask)
+
+    def describe(self, name):
+        """Count, missing, min, median, max and mean of a property."""
+        col = self.column(name).compressed()
+        if not col.size:
+            return {'count': 0, 'missing': len(self)}
+        return {'count': int(col.size), 'missing': len(self) - int(col.size), 'min': float(col.min()),
+                'p50': float(np.median(col)), 'max': float(col.max()), 'mean': float(col.mean())}
+
+    def save(self, path):
+        """Writes an uncompressed .npz, which load() can memory-map."""
+        np.savez(path, rows=self.rows, columns=np.array(self.columns, dtype=str), values=self.values,
+                 present=self.present)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Reads a saved table. With mmap=True the arrays are mapped from the file instead of read into memory."""
+        arrays = _mmap_npz(path) if mmap else None
+        if arrays is None:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        return cls(arrays['rows'], [str(c) for c in arrays['columns']], arrays['values'], arrays['present'])
+
+def _mmap_npz(path):
+    """
+    Maps every array of an uncompressed .npz straight from the zip members (np.load ignores
+    mmap_mode for .npz). Returns None if a member cannot be mapped, so the caller reads it normally.
+    """
+    readers = {(1, 0): np.lib.format.read_array_header_1_0, (2, 0): np.lib.format.read_array_header_2_0}
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED or not info.filename.endswith('.npy'):
+                return None
+            f.seek(info.header_offset)
+            header = f.read(_ZIP_LOCAL_HEADER_SIZE)
+            name_len, extra_len = struct.unpack('<HH', header[26:30])
+            f.seek(info.header_offset + _ZIP_LOCAL_HEADER_SIZE + name_len + extra_len)
+            reader = readers.get(np.lib.format.read_magic(f))
+            if reader is None:
+                return None
+            shape, fortran_order, dtype = reader(f)
+            if dtype.hasobject or 0 in shape:
+                return None
+            arrays[info.filename[:-4]] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                                   order='F' if fortran_order else 'C')
+    return arrays
+
+def _child_paths(path, node):
+    """(path, child) pairs of a node's children; `[*]` array items get their position, e.g. SID/Tags/[2]."""
+    paths = []
+    position = 0
+    for child in node.children:
+        name = child.name
+        if name == '[*]':
+            name = f"[{position}]"
+        if child.name.startswith('['):
+            position += 1
+        paths.append((f"{path}/{name}", child))
+    return paths
+
+def extract_columns(patcher, filename, inherited=True, nested=True):
+    """
+    Builds a ColumnTable from a loaded file. With inherited=True every SID is resolved through its
+    refkey chain first, so inherited values fill their cells; nested=False keeps only SID rows.
+    Rows without any numeric property are left out. Column names keep the casing first seen.
+    """
+    rows = []
+    columns = []
+    column_index = {}
+    cells = [] # (row, column, value)
+    seen = set()
+    for sid in patcher.get_top_level_structs(filename):
+        if sid in seen:
+            continue
+        seen.add(sid)
+        node = patcher.resolve(sid) if inherited else patcher.get_struct(sid)
+        if node is None:
+            continue
+
+        # Paths are built while walking: inherited subtrees are shared and keep their own parents
+        stack = [(sid, node)]
+        while stack:
+            path, node = stack.pop()
+            row = len(rows)
+            keys = set()
+            for key, number in node.numbers():
+                lowered = key.lower()
+                if lowered in keys:
+                    continue # First definition wins, like CfgStruct.get
+                keys.add(lowered)
+                j = column_index.get(lowered)
+                if j is None:
+                    j = column_index[lowered] = len(columns)
+                    columns.append(key)
+                cells.append((row, j, number))
+            if keys:
+                rows.append(path)
+            if nested:
+                stack.extend(reversed(_child_paths(path, node)))
+
+    values = np.zeros((len(rows), len(columns)), dtype=np.float64, order='F')
+    present = np.zeros((len(rows), len(columns)), dtype=bool, order='F')
+    if cells:
+        r, c, v = zip(*cells)
+        values[r, c] = v
+        present[r, c] = True
+    return ColumnTable(np.array(rows, dtype=str), columns, values, present)
+
+def main():
+    from patch_config import SOURCE_DUMP, PARSE_CACHE_DIR, CATALOG_DB
+    from dump_catalog import open_catalog
+
+    parser = argparse.ArgumentParser(description="Export the numeric properties of a cfg file as NumPy columns and query them.")
+    parser.add_argument("--file", help="Dump-relative cfg path to extract, e.g. Content/GameLite/GameData/...cfg")
+    parser.add_argument("--own", action="store_true", help="Only values defined on each struct itself, no inheritance")
+    parser.add_argument("--top-level", action="store_true", help="Only SID rows, no nested struct paths")
+    parser.add_argument("--out", help="Save the extracted table as .npz")
+    parser.add_argument("--load", help="Query a saved .npz table (memory-mapped) instead of extracting")
+    parser.add_argument("--describe", action="append", default=[], metavar="PROPERTY",
+                        help="Print the distribution of a property")
+    parser.add_argument("--where", action="append", default=[], metavar="FILTER",
+                        help="Print the rows matching e.g. CheckEnemyTime>30 (several filters are ANDed)")
+    args = parser.parse_args()
+
+    if np is None:
+        print("Error: the column export needs numpy (pip install numpy).")
+        return 1
+    if bool(args.file) == bool(args.load):
+        parser.error("Give exactly one of --file or --load.")
+
+    if args.file:
+        patcher = psg.ModPatcher(SOURCE_DUMP, None, PARSE_CACHE_DIR, catalog=open_catalog(CATALOG_DB), lazy=True)
+        patcher.load_files([args.file])
+        filename = os.path.basename(args.file)
+        if filename not in patcher.file_trees:
+            return 1
+        table = extract_columns(patcher, filename, inherited=not args.own, nested=not args.top_level)
+        print(f"Extracted {len(table)} rows x {len(table.columns)} numeric properties from {filename}.")
+        if args.out:
+            table.save(args.out)
+            print(f"Saved to {args.out}")
+    else:
+        table = ColumnTable.load(args.load)
+        print(f"Loaded {len(table)} rows x {len(table.columns)} numeric properties from {args.load}.")
+
+    try:
+        for name in args.describe:
+            stats = table.describe(name)
+            print(f"{name}: " + ", ".join(f"{k}={v:g}" for k, v in stats.items()))
+        if args.where:
+            for row in table.where(*args.where):
+                print(row)
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e.args[0]}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
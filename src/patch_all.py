@@ -1,20 +1,153 @@
+import io
 import os
 import sys
+import argparse
+import traceback
+import contextlib
+import concurrent.futures
+
+import patch_config
+import patching_script_general as psg
+from patch_manifest import code_hashes, load_manifest, save_manifest, build_manifest, stale_reason
 from patching import lrc, sway, headshots
 
-def main():
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Output folder name -> patching module, in run order
+MODS = {
+    "LessSway": sway, # 1. LessSway
+    "RewardingHeadshots": headshots, # 2. RewardingHeadshots
+    "LongRangeCombat": lrc, # 3. LongRangeCombat
+}
+
+def resolve_mod_names(names):
+    """Maps CLI names (folder name or package name, any case) to MODS keys, keeping MODS order."""
+    lookup = {}
+    for name, module in MODS.items():
+        lookup[name.lower()] = name
+        lookup[module.__name__.rsplit('.', 1)[-1].lower()] = name
+    selected = set()
+    for name in names:
+        if name.lower() not in lookup:
+            raise ValueError(f"Unknown mod '{name}'. Available: {', '.join(MODS)}")
+        selected.add(lookup[name.lower()])
+    return [name for name in MODS if name in selected]
+
+def check_mod(name, force=False):
+    """
+    Compares a mod's manifest with its current inputs: its code, the shared patcher modules,
+    the source cfg files it read last time, the dump directories it listed, the catalog DB (for mods
+    that declare USES_CATALOG) and its own output files.
+    Returns (code, config, reason to regenerate or None if up to date).
+    """
+    manifest_path = patch_config.get_manifest_path(name)
+    code = code_hashes(SRC_DIR, os.path.dirname(MODS[name].__file__))
+    config = {'source_dump': os.path.abspath(patch_config.SOURCE_DUMP)}
+    if getattr(MODS[name], 'USES_CATALOG', False):
+        config['catalog_db'] = os.path.abspath(patch_config.CATALOG_DB)
+    if force:
+        return code, config, "forced"
+    return code, config, stale_reason(load_manifest(manifest_path), code, config, patch_config.SOURCE_DUMP,
+                                      os.path.dirname(manifest_path))
+
+def run_mod(name, code, config):
+    """Runs one mod and records its manifest."""
+    manifest_path = patch_config.get_manifest_path(name)
+    patcher = MODS[name].run()
+    save_manifest(manifest_path, build_manifest(code, config, patch_config.SOURCE_DUMP, patcher.sources,
+                                                os.path.dirname(manifest_path), patcher.output_files,
+                                                patcher.source_dirs))
+
+def _run_mod_guarded(name, code, config):
+    """Runs one mod, printing the traceback instead of raising if it fails. Returns True if it succeeded."""
+    try:
+        run_mod(name, code, config)
+        return True
+    except Exception:
+        traceback.print_exc(file=sys.stdout)
+        return False
+
+def _run_mod_captured(name, code, config):
+    """Worker entry point: runs a mod with its output captured. Returns (log, succeeded)."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        succeeded = _run_mod_guarded(name, code, config)
+    return out.getvalue(), succeeded
+
+def preload_dump(names):
+    """
+    Scans, in this process, every source file the given mods read on their last run. Forked
+    workers inherit one read-only copy instead of each loading it again; spawned workers (the
+    Windows default) start with nothing, but find every scan in the parse cache this writes.
+    """
+    rel_paths = []
+    for name in names:
+        manifest = load_manifest(patch_config.get_manifest_path(name))
+        if manifest:
+            rel_paths += [p for p in manifest['sources'] if p not in rel_paths]
+    if rel_paths:
+        registry = psg.get_dump_registry(patch_config.SOURCE_DUMP, patch_config.PARSE_CACHE_DIR)
+        registry.preload(rel_paths, lazy=True)
+
+def run_mods(stale, jobs):
+    """
+    Runs (name, code, config) entries from check_mod in a process pool, printing each mod's log
+    whole and in MODS order whatever order they finish in. If the pool cannot start or breaks,
+    the mods that did not finish run serially. Returns False if any mod failed.
+    """
+    preload_dump([name for name, _, _ in stale])
+
+    futures = []
+    try:
+        with concurrent.futures.ProcessPoolExecutor(jobs) as pool:
+            for entry in stale:
+                futures.append((entry[0], pool.submit(_run_mod_captured, *entry)))
+            for _, future in futures:
+                future.result()
+    except (OSError, NotImplementedError, concurrent.futures.process.BrokenProcessPool) as e:
+        print(f"Warning: parallel run unavailable ({e}), running the remaining mods serially.")
+    results = {name: future.result() for name, future in futures if future.done() and future.exception() is None}
+
+    succeeded = []
+    for name, code, config in stale:
+        if name in results:
+            log, ok = results[name]
+            print(log, end="")
+        else:
+            ok = _run_mod_guarded(name, code, config)
+        succeeded.append(ok)
+    return all(succeeded)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the patch files of the selected mods (all by default).")
+    parser.add_argument("mods", nargs="*", help=f"Mods to patch: {', '.join(MODS)} (or sway, headshots, lrc)")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if no input changed")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Mods to run at once (default: one per CPU, at most one per mod; 1 runs serially)")
+    args = parser.parse_args(argv)
+
+    try:
+        selected = resolve_mod_names(args.mods) if args.mods else list(MODS)
+    except ValueError as e:
+        parser.error(str(e))
+
     print("Starting all patching tasks...")
-    
-    # 1. LessSway (Refactored Module)
-    sway.run()
-    
-    # 2. RewardingHeadshots (Refactored Module)
-    headshots.run()
-    
-    # 3. LongRangeCombat (Refactored Module)
-    lrc.run()
-    
-    print("All patching tasks completed.")
+    stale = []
+    for name in selected:
+        code, config, reason = check_mod(name, args.force)
+        if reason is None:
+            print(f"--- {name} is up to date, skipping ---")
+        else:
+            print(f"DEBUG: Regenerating {name} ({reason}).")
+            stale.append((name, code, config))
+
+    jobs = min(args.jobs or os.cpu_count() or 1, len(stale))
+    if jobs > 1:
+        ok = run_mods(stale, jobs)
+    else:
+        ok = all([_run_mod_guarded(*entry) for entry in stale])
+    print("All patching tasks completed." if ok else "Patching finished with errors.")
+    return 0 if ok else 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
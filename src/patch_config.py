@@ -4,11 +4,21 @@ import os
 SOURCE_DUMP = r'C:\dev\stalker2\cfg_dump_1-8-1\Stalker2'
 MODS_DATA_ROOT = r'C:\dev\stalker2\mods\mods'
 
+# Parsed dump files are cached here between runs (safe to delete at any time)
+PARSE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.parse_cache')
+
+# SQLite index of the whole dump, built with `python dump_catalog.py` (optional)
+CATALOG_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.dump_catalog.sqlite')
+
 def get_mod_root(mod_name):
     """Returns the absolute path to the Stalker2 GameData root for a specific mod."""
     # Note: Traditional folder structure: <ModName>/<ModName>_P/Stalker2
     return os.path.join(MODS_DATA_ROOT, mod_name, f"{mod_name}_P", "Stalker2")
 
+def get_manifest_path(mod_name):
+    """Returns where patch_all records the inputs and outputs of a mod's last run (outside the packed _P folder)."""
+    return os.path.join(MODS_DATA_ROOT, mod_name, ".patch_manifest.json")
+
 # Common file lists
 LRC_FILES = [
     'Content/GameLite/GameData/ObjPrototypes/GeneralNPCObjPrototypes.cfg',
@@ -0,0 +1,106 @@
+import os
+import json
+import hashlib
+
+MANIFEST_VERSION = 3
+
+# Code every mod depends on besides its own package
+SHARED_CODE = ['patching_script_general.py', 'patch_config.py', 'dump_catalog.py']
+
+def file_sha1(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def code_hashes(src_dir, package_dir):
+    """Hashes the shared patcher modules plus every .py file of one mod package, keyed by path relative to src."""
+    paths = [os.path.join(src_dir, name) for name in SHARED_CODE]
+    for dirpath, _, files in os.walk(package_dir):
+        paths += [os.path.join(dirpath, f) for f in files if f.endswith('.py')]
+    return {os.path.relpath(p, src_dir).replace('\\', '/'): file_sha1(p) for p in sorted(paths) if os.path.exists(p)}
+
+def _same_file(path, size, mtime_ns, sha1):
+    """Stat first, hash only if size or mtime moved."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if st.st_size == size and st.st_mtime_ns == mtime_ns:
+        return True
+    return st.st_size == size and file_sha1(path) == sha1
+
+def _file_record(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns, file_sha1(path)]
+
+def load_manifest(path):
+    """Returns the manifest dict, or None if it is missing, unreadable or from another version."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+def save_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def _list_dir(path):
+    try:
+        return sorted(os.listdir(path))
+    except OSError:
+        return None
+
+def _catalog_record(config):
+    """Fingerprint of the catalog DB named by config['catalog_db'], or None if the mod uses none or it is not built."""
+    catalog_db = config.get('catalog_db')
+    return _file_record(catalog_db) if catalog_db and os.path.exists(catalog_db) else None
+
+def build_manifest(code, config, source_dump, sources, output_root, output_files, source_dirs=None):
+    """
+    Records one mod run: hashes of its code, its config values, the fingerprint of every source
+    file the patcher read, the listing of every dump directory it enumerated, the catalog DB it
+    was run with and every output file it produced (relative to output_root).
+    """
+    return {
+        'version': MANIFEST_VERSION,
+        'code': code,
+        'config': config,
+        'sources': {rel: list(fp) if fp else _file_record(os.path.join(source_dump, rel)) for rel, fp in sources.items()},
+        'source_dirs': {rel: list(entries) for rel, entries in (source_dirs or {}).items()},
+        'catalog': _catalog_record(config),
+        'outputs': {os.path.relpath(p, output_root).replace('\\', '/'): _file_record(p) for p in sorted(set(output_files))},
+    }
+
+def stale_reason(manifest, code, config, source_dump, output_root):
+    """Returns why a mod must be regenerated, or None if its recorded inputs and outputs are unchanged."""
+    if manifest is None:
+        return "no manifest"
+    if manifest['config'] != config:
+        return "config changed"
+    for name in sorted(set(code) | set(manifest['code'])):
+        if code.get(name) != manifest['code'].get(name):
+            return f"{name} changed"
+    for rel_path, (size, mtime_ns, sha1) in manifest['sources'].items():
+        if not _same_file(os.path.join(source_dump, rel_path), size, mtime_ns, sha1):
+            return f"{rel_path} changed"
+    for rel_dir, entries in manifest['source_dirs'].items():
+        if _list_dir(os.path.join(source_dump, rel_dir)) != entries:
+            return f"files added to or removed from {rel_dir}"
+    if config.get('catalog_db'):
+        recorded = manifest['catalog']
+        if recorded is None:
+            if os.path.exists(config['catalog_db']):
+                return "catalog built"
+        elif not _same_file(config['catalog_db'], *recorded):
+            return "catalog changed"
+    for rel_path, (size, mtime_ns, sha1) in manifest['outputs'].items():
+        if not _same_file(os.path.join(output_root, rel_path), size, mtime_ns, sha1):
+            return f"output {rel_path} missing or modified"
+    return None
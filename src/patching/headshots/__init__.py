@@ -1,17 +1,19 @@
 import os
-import re
 import patching_script_general as psg
-from patch_config import SOURCE_DUMP, get_mod_root
+from patch_config import SOURCE_DUMP, PARSE_CACHE_DIR, get_mod_root
 
 V1_HEAD = 8.0
 V1_BODY = 2.0
 V1_LIMBS = 1.0
 
-def get_original_coefs(struct_data):
+def get_original_coefs(bdc_node):
     def find_coef(bone_name):
-        pattern = rf'DamageBone\s*=\s*EDamageBone::{bone_name}\s+DamageCoef\s*=\s*([\d\.]+)'
-        match = re.search(pattern, struct_data, re.IGNORECASE)
-        return float(match.group(1)) if match else 1.0
+        for entry in bdc_node.children:
+            bone = entry.get("DamageBone")
+            if isinstance(bone, str) and bone.lower() == f"edamagebone::{bone_name.lower()}":
+                coef = entry.get("DamageCoef")
+                return float(coef) if isinstance(coef, (int, float)) else 1.0
+        return 1.0
     return {'Head': find_coef('Head'), 'Body': find_coef('Body'), 'Limbs': find_coef('Limbs')}
 
 def calculate_coefs(original, is_zombie=False, is_special=False):
@@ -37,40 +39,18 @@ def calculate_coefs(original, is_zombie=False, is_special=False):
         }
 
 def is_zombie_check(struct_name, patcher):
-    current = struct_name
-    visited = set()
-    while current and current not in visited:
-        if "zombie" in current.lower(): return True
-        visited.add(current)
-        mapping = patcher.struct_to_file.get(current)
-        if mapping:
-            data = psg.get_struct_content(patcher.file_contents[mapping[0]], current)
-            if data and re.search(r'^\s*IsZombie\s*=\s*true', data, re.MULTILINE | re.IGNORECASE):
-                return True
-        current = patcher.global_tree.get(current)
-    return False
-
-def find_defining_parent(struct_name, patcher):
-    current = struct_name
-    visited = set()
-    while current and current not in visited:
-        visited.add(current)
-        mapping = patcher.struct_to_file.get(current)
-        if mapping:
-            data = psg.get_struct_content(patcher.file_contents[mapping[0]], current)
-            if data and "BoneDamageCoefficients" in data:
-                return data
-        current = patcher.global_tree.get(current)
-    return None
+    if any("zombie" in current.lower() for current in patcher.get_ancestors(struct_name)):
+        return True
+    return patcher.get_effective_value(struct_name, "IsZombie", deep=True) is True
 
 def run():
     print("--- Running RewardingHeadshots Patching ---")
     mod_root = get_mod_root("RewardingHeadshots")
-    patcher = psg.ModPatcher(SOURCE_DUMP, mod_root)
+    patcher = psg.ModPatcher(SOURCE_DUMP, mod_root, PARSE_CACHE_DIR, lazy=True)
     
     obj_proto_rel_dir = 'Content/GameLite/GameData/ObjPrototypes'
-    obj_proto_abs_dir = os.path.join(SOURCE_DUMP, obj_proto_rel_dir)
-    files = [os.path.join(obj_proto_rel_dir, f) for f in os.listdir(obj_proto_abs_dir) if f.endswith('.cfg')]
+    # Listed through the patcher so patch_all notices cfg files being added or removed
+    files = [os.path.join(obj_proto_rel_dir, f) for f in patcher.list_source_dir(obj_proto_rel_dir) if f.endswith('.cfg')]
     patcher.load_files(files)
     
     target_structs = patcher.get_all_inheritors("NPCBase")
@@ -80,24 +60,23 @@ def run():
         if not filename_info: continue
         filename, _ = filename_info
         
-        content = patcher.file_contents[filename]
-        data = psg.get_struct_content(content, s)
-        
         is_z = is_zombie_check(s, patcher)
-        has_local = data and "BoneDamageCoefficients" in data
+        has_local = patcher.get_struct(s).find("BoneDamageCoefficients") is not None
         
-        defining_data = data if has_local else find_defining_parent(s, patcher)
-        orig_coefs = get_original_coefs(defining_data) if defining_data else {'Head': V1_HEAD, 'Body': V1_BODY, 'Limbs': V1_LIMBS}
+        # Inherited coefficients come from the nearest struct in the chain that defines them
+        bdc = patcher.resolve(s).find("BoneDamageCoefficients")
+        orig_coefs = get_original_coefs(bdc) if bdc else {'Head': V1_HEAD, 'Body': V1_BODY, 'Limbs': V1_LIMBS}
         
         final = calculate_coefs(orig_coefs, is_zombie=is_z, is_special=has_local and not is_z)
         
-        bdc = [
-            f"[*] : struct.begin\n         DamageBone = EDamageBone::Head\n         DamageCoef = {final['Head']:.1f}\n      struct.end",
-            f"[*] : struct.begin\n         DamageBone = EDamageBone::Body\n         DamageCoef = {final['Body']:.1f}\n      struct.end",
-            f"[*] : struct.begin\n         DamageBone = EDamageBone::Limbs\n         DamageCoef = {final['Limbs']:.1f}\n      struct.end"
-        ]
-        
-        patch_text = psg.generate_bpatch(s, ["BoneDamageCoefficients : struct.begin"], bdc)
-        patcher.add_patch(filename, patch_text)
+        # The array is replaced wholesale, so the node is written without {bpatch}
+        patch = psg.BPatch(s)
+        bdc_patch = patch.node("BoneDamageCoefficients", bpatch=False)
+        for bone in ('Head', 'Body', 'Limbs'):
+            entry = bdc_patch.add_struct_item()
+            entry.set("DamageBone", f"EDamageBone::{bone}")
+            entry.set("DamageCoef", f"{final[bone]:.1f}")
+        patcher.add_patch(filename, patch)
         
     patcher.save_all("RewardingHeadshots")
+    return patcher
@@ -1,20 +1,32 @@
 import patching_script_general as psg
-from patch_config import SOURCE_DUMP, get_mod_root, LRC_FILES
-from .logic import patch_npc_vision, patch_vision_scanners, patch_weapons, patch_npc_attributes
+from dump_catalog import open_catalog
+from patch_config import SOURCE_DUMP, PARSE_CACHE_DIR, CATALOG_DB, get_mod_root, LRC_FILES
+from .engine import RuleEngine
+from .classify import WeaponClasses
+from .logic import register_npc_vision, register_vision_scanners, register_weapons, register_npc_attributes
 from .utils import load_weapon_stats_map
 
+# Refkeys resolve through the catalog, so patch_all regenerates this mod when it is built or rebuilt
+USES_CATALOG = True
+
 def run():
     print("--- Running LongRangeCombat Patching ---")
     mod_root = get_mod_root("LongRangeCombat")
-    patcher = psg.ModPatcher(SOURCE_DUMP, mod_root)
+    # The catalog (if built) lets refkeys resolve into files outside LRC_FILES
+    patcher = psg.ModPatcher(SOURCE_DUMP, mod_root, PARSE_CACHE_DIR, catalog=open_catalog(CATALOG_DB), lazy=True)
     patcher.load_files(LRC_FILES)
     
     weapon_stats = load_weapon_stats_map(patcher)
     print(f"DEBUG: Loaded stats for {len(weapon_stats)} weapons.")
+    classes = WeaponClasses(patcher, weapon_stats)
     
-    patch_npc_vision(patcher)
-    patch_vision_scanners(patcher)
-    patch_weapons(patcher)
-    patch_npc_attributes(patcher, weapon_stats)
+    # Every rule runs inside one sweep per loaded file
+    engine = RuleEngine(patcher)
+    register_npc_vision(engine)
+    register_vision_scanners(engine)
+    register_weapons(engine, classes)
+    register_npc_attributes(engine, classes)
+    engine.run()
     
     patcher.save_all("LongRangeCombat")
+    return patcher
@@ -0,0 +1,315 @@
+try:
+    import numpy as np
+except ImportError:  # Optional: BurstMatrix falls back to the scalar path
+    np = None
+
+from .constants import RANK_CONFIGS, MASTER_FSD_THRESHOLD, IGNORE_DISP_LOW_AMMO_THRESHOLD
+
+BRACKETS = ["Short", "Medium", "Long"]
+DEFAULT_RANK_CONFIG = {"range_mult": 1.5, "burst_logic": {}}
+
+
+def compute_bracket(t, bracket, config, orig_min, orig_max, orig_ignore_max, max_ammo, fsd, is_sniper, is_shotgun):
+    """
+    Scalar burst/dispersion logic for one rank bracket of one NPC weapon.
+    Returns (MinShots, MaxShots, IgnoreDispersionMinShots, IgnoreDispersionMaxShots); the ignore pair is
+    (None, None) for shotguns.
+    """
+    blogic = config.get("burst_logic", {})
+    process_dispersion = not is_shotgun
+    process_burst = not is_sniper and not is_shotgun
+
+    new_min, new_max = orig_min, orig_max
+
+    if process_burst:
+        base_mult = blogic.get("burst_mult", 1.0)
+        mult_min = base_mult
+        mult_max = base_mult
+
+        if bracket == "Long":
+            mult_max *= blogic.get("long_burst_mult", 1.0)
+            # Use min_long_burst_mult if avail, else fallback to long_burst_mult
+            mult_min *= blogic.get("min_long_burst_mult", blogic.get("long_burst_mult", 1.0))
+        elif bracket == "Medium":
+            mult_max *= blogic.get("medium_burst_mult", 1.0)
+            mult_min = mult_max
+        elif bracket == "Short":
+            mult_max *= blogic.get("short_burst_mult", 1.0)
+            mult_min = mult_max
+
+        new_min = int(orig_min * mult_min) + blogic.get("min_add", 0)
+        new_max = int(orig_max * mult_max) + blogic.get("max_add", 0)
+
+        if mult_max > 1.0 and new_max == orig_max:
+            new_max += 1
+
+        if t == "Master" and bracket == "Long":
+            limit_min_val = max(1, int(max_ammo * 0.05))
+            limit_max_val = max(1, int(max_ammo * 0.10))
+
+            limit_min = min(2, limit_min_val)
+            limit_max = min(3, limit_max_val)
+
+            new_min = min(new_min, limit_min)
+            new_max = min(new_max, limit_max)
+
+        # Ensure Min < Max (User requirement) regardless of clamping
+        if new_min >= new_max:
+            new_max = new_min + 1
+
+        new_max = min(new_max, max_ammo)
+        new_min = min(new_min, new_max)
+
+        # If after clamping to max_ammo, Min >= Max (meaning both hit ceiling), reduce Min
+        if new_min >= new_max and new_min > 1:
+            new_min = new_max - 1
+
+        if new_min < 1: new_min = 1
+        if new_max < new_min: new_max = new_min + 1
+
+    ignore_min, ignore_max = None, None
+    if process_dispersion:
+        floor_min = config.get("ignore_disp_min", {}).get(bracket, 0)
+        floor_max = config.get("ignore_disp_max", {}).get(bracket, 0)
+        chance_min = config.get("ignore_disp_chance_min", {}).get(bracket, 0)
+        chance_max = config.get("ignore_disp_chance_max", {}).get(bracket, 0)
+
+        ignore_min = max(floor_min, int(new_min * chance_min))
+        ignore_max = max(floor_max, int(new_min * chance_max))
+
+        if blogic.get("ignore_disp_max_inc_if_small") and new_max < IGNORE_DISP_LOW_AMMO_THRESHOLD:
+            ignore_max += 1
+
+        if bracket == "Long": ignore_max += blogic.get("guaranteed_add_long", 0)
+        if bracket == "Medium":
+            ignore_min += blogic.get("guaranteed_add_medium_min", 0)
+            ignore_max += blogic.get("guaranteed_add_medium_max", 0)
+
+        if t == "Master":
+            if bracket == "Long":
+                ignore_min += blogic.get("guaranteed_add_long_min", 0)
+                ignore_max += blogic.get("guaranteed_add_long_max", 0)
+            elif bracket == "Medium":
+                ignore_min += blogic.get("guaranteed_add_medium_min", 0)
+                ignore_max += blogic.get("guaranteed_add_medium_max", 0)
+            elif bracket == "Short":
+                mag_floor = int(max_ammo * blogic.get("guaranteed_add_short_mag_pct", 0))
+                ignore_min = max(ignore_min, mag_floor)
+                ignore_max = max(ignore_max, mag_floor)
+
+        if is_sniper:
+            if t == "Experienced":
+                if bracket == "Short":
+                    ignore_max = 1
+                elif bracket == "Medium":
+                    ignore_max = 1
+                elif bracket == "Long":
+                    ignore_max = 0  # No chance for Experienced at Long
+            elif t == "Veteran":
+                if bracket == "Short":
+                    ignore_min = 1
+                    ignore_max = 1
+                else:  # Medium and Long
+                    ignore_max = 1  # Chance to hit (might miss)
+                    ignore_min = 0
+            elif t == "Master":
+                ignore_max = 1  # Always a chance (might miss)
+                if bracket in ["Short", "Medium"]:
+                    ignore_min = 1  # Guaranteed hit (1/1)
+                else:
+                    ignore_min = 0  # Might miss (0/1)
+
+        if t == "Zombie":
+            ignore_max = 1
+
+        if t == "Master" and bracket == "Long" and not is_sniper:
+            if fsd < MASTER_FSD_THRESHOLD:
+                ignore_max = max(1, orig_ignore_max)
+            else:
+                ignore_max = max(0, orig_ignore_max - 1)
+
+        ignore_max = min(ignore_max, new_max)
+        ignore_min = min(ignore_min, ignore_max)
+
+    return new_min, new_max, ignore_min, ignore_max
+
+
+def bracket_params(t, bracket, config):
+    """
+    Flattens everything compute_bracket reads from a rank config for one (rank, bracket) into a tuple of
+    numbers, in PARAM_COLUMNS order. Rank-specific branches become flags and override values (-1 = keep).
+    """
+    blogic = config.get("burst_logic", {})
+    base_mult = blogic.get("burst_mult", 1.0)
+    if bracket == "Long":
+        mult_max = base_mult * blogic.get("long_burst_mult", 1.0)
+        mult_min = base_mult * blogic.get("min_long_burst_mult", blogic.get("long_burst_mult", 1.0))
+    else:
+        mult_max = mult_min = base_mult * blogic.get(f"{bracket.lower()}_burst_mult", 1.0)
+
+    add_min = add_max = 0
+    if bracket == "Long":
+        add_max += blogic.get("guaranteed_add_long", 0)
+    if bracket == "Medium":
+        add_min += blogic.get("guaranteed_add_medium_min", 0)
+        add_max += blogic.get("guaranteed_add_medium_max", 0)
+    if t == "Master" and bracket in ("Long", "Medium"):
+        add_min += blogic.get(f"guaranteed_add_{bracket.lower()}_min", 0)
+        add_max += blogic.get(f"guaranteed_add_{bracket.lower()}_max", 0)
+
+    sniper_min = sniper_max = -1
+    if t == "Experienced":
+        sniper_max = 0 if bracket == "Long" else 1
+    elif t == "Veteran":
+        sniper_min, sniper_max = (1, 1) if bracket == "Short" else (0, 1)
+    elif t == "Master":
+        sniper_min, sniper_max = (0, 1) if bracket == "Long" else (1, 1)
+
+    is_master_short = t == "Master" and bracket == "Short"
+    return (mult_min, mult_max, blogic.get("min_add", 0), blogic.get("max_add", 0),
+            config.get("ignore_disp_min", {}).get(bracket, 0), config.get("ignore_disp_max", {}).get(bracket, 0),
+            config.get("ignore_disp_chance_min", {}).get(bracket, 0),
+            config.get("ignore_disp_chance_max", {}).get(bracket, 0),
+            1 if blogic.get("ignore_disp_max_inc_if_small") else 0, add_min, add_max,
+            1 if is_master_short else 0, blogic.get("guaranteed_add_short_mag_pct", 0) if is_master_short else 0,
+            sniper_min, sniper_max, 1 if t == "Zombie" else 0, 1 if t == "Master" and bracket == "Long" else 0)
+
+
+PARAM_COLUMNS = ["mult_min", "mult_max", "min_add", "max_add", "floor_min", "floor_max", "chance_min",
+                 "chance_max", "inc_if_small", "add_min", "add_max", "mag_floor", "mag_pct", "sniper_min",
+                 "sniper_max", "zombie", "master_long"]
+
+
+class BurstMatrix:
+    """
+    Gathers the inputs of every (weapon, rank, bracket) burst computation into columns, then computes
+    them all at once: with NumPy when it is installed, else row by row with compute_bracket. Both paths
+    give the same numbers (checked by src/tests/test_bursts.py).
+    """
+
+    def __init__(self):
+        self.ranks = []
+        self.brackets = []
+        self.configs = []
+        self.orig_min = []
+        self.orig_max = []
+        self.orig_ignore_max = []
+        self.max_ammo = []
+        self.fsd = []
+        self.is_sniper = []
+        self.is_shotgun = []
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def add_row(self, t, bracket, config, orig_min, orig_max, orig_ignore_max, max_ammo, fsd, is_sniper, is_shotgun):
+        """Queues one bracket and returns its row index in the compute() results."""
+        self.ranks.append(t)
+        self.brackets.append(bracket)
+        self.configs.append(config)
+        self.orig_min.append(orig_min)
+        self.orig_max.append(orig_max)
+        self.orig_ignore_max.append(orig_ignore_max)
+        self.max_ammo.append(max_ammo)
+        self.fsd.append(fsd)
+        self.is_sniper.append(is_sniper)
+        self.is_shotgun.append(is_shotgun)
+        return len(self.ranks) - 1
+
+    def compute(self):
+        """Returns a (MinShots, MaxShots, IgnoreMin, IgnoreMax) tuple per row, vectorized if NumPy is available."""
+        return self.compute_vectorized() if np is not None else self.compute_scalar()
+
+    def compute_scalar(self):
+        return [compute_bracket(*row) for row in zip(self.ranks, self.brackets, self.configs, self.orig_min,
+                                                      self.orig_max, self.orig_ignore_max, self.max_ammo, self.fsd,
+                                                      self.is_sniper, self.is_shotgun)]
+
+    def param_columns(self):
+        """One array per PARAM_COLUMNS entry, resolved once per distinct (rank, bracket, config) and indexed per row."""
+        table = []
+        index = {}
+        rows = []
+        for t, bracket, config in zip(self.ranks, self.brackets, self.configs):
+            key = (t, bracket, id(config))
+            if key not in index:
+                index[key] = len(table)
+                table.append(bracket_params(t, bracket, config))
+            rows.append(index[key])
+        table = np.array(table, dtype=np.float64).reshape(-1, len(PARAM_COLUMNS))
+        rows = np.array(rows, dtype=np.intp)
+        return {name: table[rows, i] for i, name in enumerate(PARAM_COLUMNS)}
+
+    def compute_vectorized(self):
+        if np is None:
+            raise RuntimeError("numpy is not installed")
+        if not self.ranks:
+            return []
+
+        p = self.param_columns()
+
+        def as_int(name):
+            return p[name].astype(np.int64)
+
+        orig_min = np.array(self.orig_min, dtype=np.int64)
+        orig_max = np.array(self.orig_max, dtype=np.int64)
+        orig_ignore_max = np.array(self.orig_ignore_max, dtype=np.int64)
+        max_ammo = np.array(self.max_ammo, dtype=np.int64)
+        fsd = np.array(self.fsd, dtype=np.float64)
+        sniper = np.array(self.is_sniper, dtype=bool)
+        shotgun = np.array(self.is_shotgun, dtype=bool)
+        master_long = p["master_long"] > 0
+        burst = ~sniper & ~shotgun
+
+        # Burst sizes (float products truncate toward zero exactly like int())
+        new_min = np.trunc(orig_min * p["mult_min"]).astype(np.int64) + as_int("min_add")
+        new_max = np.trunc(orig_max * p["mult_max"]).astype(np.int64) + as_int("max_add")
+        new_max += (p["mult_max"] > 1.0) & (new_max == orig_max)
+
+        limit_min = np.minimum(2, np.maximum(1, np.trunc(max_ammo * 0.05).astype(np.int64)))
+        limit_max = np.minimum(3, np.maximum(1, np.trunc(max_ammo * 0.10).astype(np.int64)))
+        new_min = np.where(master_long, np.minimum(new_min, limit_min), new_min)
+        new_max = np.where(master_long, np.minimum(new_max, limit_max), new_max)
+
+        new_max = np.where(new_min >= new_max, new_min + 1, new_max)
+        new_max = np.minimum(new_max, max_ammo)
+        new_min = np.minimum(new_min, new_max)
+        new_min = np.where((new_min >= new_max) & (new_min > 1), new_max - 1, new_min)
+        new_min = np.maximum(new_min, 1)
+        new_max = np.where(new_max < new_min, new_min + 1, new_max)
+
+        new_min = np.where(burst, new_min, orig_min)
+        new_max = np.where(burst, new_max, orig_max)
+
+        # Guaranteed hits
+        ignore_min = np.maximum(as_int("floor_min"), np.trunc(new_min * p["chance_min"]).astype(np.int64))
+        ignore_max = np.maximum(as_int("floor_max"), np.trunc(new_min * p["chance_max"]).astype(np.int64))
+        ignore_max += (p["inc_if_small"] > 0) & (new_max < IGNORE_DISP_LOW_AMMO_THRESHOLD)
+        ignore_min += as_int("add_min")
+        ignore_max += as_int("add_max")
+
+        mag_floor = np.trunc(max_ammo * p["mag_pct"]).astype(np.int64)
+        has_mag_floor = p["mag_floor"] > 0
+        ignore_min = np.where(has_mag_floor, np.maximum(ignore_min, mag_floor), ignore_min)
+        ignore_max = np.where(has_mag_floor, np.maximum(ignore_max, mag_floor), ignore_max)
+
+        sniper_min = as_int("sniper_min")
+        sniper_max = as_int("sniper_max")
+        ignore_min = np.where(sniper & (sniper_min >= 0), sniper_min, ignore_min)
+        ignore_max = np.where(sniper & (sniper_max >= 0), sniper_max, ignore_max)
+
+        ignore_max = np.where(p["zombie"] > 0, 1, ignore_max)
+
+        fsd_override = np.where(fsd < MASTER_FSD_THRESHOLD, np.maximum(1, orig_ignore_max),
+                                np.maximum(0, orig_ignore_max - 1))
+        ignore_max = np.where(master_long & ~sniper, fsd_override, ignore_max)
+
+        ignore_max = np.minimum(ignore_max, new_max)
+        ignore_min = np.minimum(ignore_min, ignore_max)
+
+        results = []
+        for n_min, n_max, i_min, i_max, is_shotgun in zip(new_min.tolist(), new_max.tolist(), ignore_min.tolist(),
+                                                          ignore_max.tolist(), self.is_shotgun):
+            results.append((n_min, n_max, None, None) if is_shotgun else (n_min, n_max, i_min, i_max))
+        return results
+
@@ -0,0 +1,64 @@
+import collections
+
+import patching_script_general as psg
+
+# Weapon class bits. A SID carries the bit of every template it inherits from, itself included,
+# so new classes only need an entry here.
+SHOTGUN, SNIPER, PISTOL, SMG = 1, 2, 4, 8
+CLASS_TEMPLATES = {"TemplateShotgun": SHOTGUN, "TemplateSniper": SNIPER, "TemplatePistol": PISTOL, "TemplateSMG": SMG}
+
+WeaponClass = collections.namedtuple('WeaponClass', 'flags excluded stats')
+
+
+def is_excluded_weapon(sid):
+    """Weapons LRC leaves alone: special NPCs' and the RPG-7."""
+    return psg.is_special_npc(sid) or "RPG7" in sid.upper()
+
+
+class WeaponClasses:
+    """
+    Classification of every loaded SID, computed in one top-down pass over the refkey tree:
+    its class bits, whether LRC excludes it, and its WeaponGeneralSetupPrototypes stats (looked up
+    by SID, then with the _NPC/_Player suffix stripped). Rules read it with get() in O(1).
+    Built after load_files; SIDs loaded later are classified on first lookup.
+    """
+
+    def __init__(self, patcher, weapon_stats):
+        self.weapon_stats = weapon_stats
+        self.table = {}
+        tree = patcher.global_tree
+        children_index = patcher.children_index
+
+        # Roots: structs without a refkey, and parents defined in files that are not loaded
+        roots = [sid for sid, parent in tree.items() if not parent]
+        roots += [parent for parent in children_index if parent not in tree]
+        stack = [(sid, CLASS_TEMPLATES.get(sid, 0)) for sid in roots]
+        while stack:
+            sid, flags = stack.pop()
+            if sid in self.table:
+                continue
+            self.table[sid] = self._record(sid, flags)
+            for child in children_index.get(sid, ()):
+                stack.append((child, flags | CLASS_TEMPLATES.get(child, 0)))
+
+        # Only refkey loops are left; load_files already warned about them
+        for sid in tree:
+            if sid not in self.table:
+                self.table[sid] = self._record(sid, CLASS_TEMPLATES.get(sid, 0))
+
+    def _record(self, sid, flags):
+        stats = self.weapon_stats.get(sid) or self.weapon_stats.get(sid.replace("_NPC", "").replace("_Player", ""))
+        return WeaponClass(flags, is_excluded_weapon(sid), stats or {})
+
+    def get(self, sid):
+        record = self.table.get(sid)
+        if record is None:
+            record = self.table[sid] = self._record(sid, CLASS_TEMPLATES.get(sid, 0))
+        return record
+
+    def include(self, sid):
+        """name_filter for the NPC weapon rules."""
+        return not self.get(sid).excluded
+
+    def __len__(self):
+        return len(self.table)
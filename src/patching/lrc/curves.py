@@ -5,22 +5,27 @@ def sigmoid(x, L, k, x0):
     return L / (1 + math.exp(-k * (x - x0)))
 
 
-def get_rank_configs():
+# Sigmoid parameters of the guaranteed hit curves; get_rank_configs takes any of them as keyword overrides
+CURVE_PARAMS = {
+    # Max Curve
+    "L_max": 0.7,  # Max multiplier plateau
+    "k_max": 2.5,  # Sharp rise
+    "x0_max": 1.4,  # Shift left for earlier effectiveness
+    "C_max": 0.01,  # Small baseline shift
+    # Min Curve
+    "L_min": 0.5,  # Min multiplier plateau
+    "k_min": 1.8,
+    "x0_min": 1.8,
+    "C_min": 0.05,
+}
+
+
+def get_rank_configs(L_max=CURVE_PARAMS["L_max"], k_max=CURVE_PARAMS["k_max"], x0_max=CURVE_PARAMS["x0_max"],
+                     C_max=CURVE_PARAMS["C_max"], L_min=CURVE_PARAMS["L_min"], k_min=CURVE_PARAMS["k_min"],
+                     x0_min=CURVE_PARAMS["x0_min"], C_min=CURVE_PARAMS["C_min"]):
     ranks = ["Newbie", "Experienced", "Veteran", "Master", "Zombie"]
     brackets = ["Short", "Medium", "Long"]
 
-    # Sigmoid parameters for Max Curve
-    L_max = 0.7  # Max multiplier plateau
-    k_max = 2.5  # Sharp rise
-    x0_max = 1.4  # Shift left for earlier effectiveness
-    C_max = 0.01  # Small baseline shift
-
-    # Sigmoid parameters for Min Curve
-    L_min = 0.5  # Min multiplier plateau
-    k_min = 1.8
-    x0_min = 1.8
-    C_min = 0.05
-
     rank_map = {"Newbie": 0.5, "Experienced": 2, "Veteran": 3, "Master": 4, "Zombie": 1}
 
     # Distance penalties
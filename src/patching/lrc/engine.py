@@ -0,0 +1,73 @@
+import patching_script_general as psg
+
+
+class Rule:
+    """A per-struct patch rule: which structs it applies to and what it does with them."""
+
+    def __init__(self, name, apply, filename=None, base=None, name_filter=None, summary=None, finish=None):
+        self.name = name
+        self.apply = apply  # apply(patcher, filename, struct_name, struct_data) -> True if it queued a patch
+        self.finish = finish  # finish(patcher), run after the sweep by rules that batch their work
+        self.filename = filename  # None = every loaded file
+        self.base = base  # only structs inheriting from this SID (itself included)
+        self.name_filter = name_filter  # struct_name -> bool
+        self.summary = summary  # printed after the sweep, formatted with {count}
+        self.count = 0
+        self.swept = False
+
+    def matches(self, struct_name, inheritors):
+        if self.base is not None and struct_name not in inheritors[self.base]:
+            return False
+        return self.name_filter is None or self.name_filter(struct_name)
+
+
+class RuleEngine:
+    """
+    Sweeps each loaded file once and hands every top-level struct to all the rules registered
+    for that file that match it, so LRC can grow rules without adding passes over the dump.
+    Structs are visited in file order; a SID defined twice in a file is visited once, like
+    get_struct_content would find it.
+    """
+
+    def __init__(self, patcher):
+        self.patcher = patcher
+        self.rules = []
+
+    def add_rule(self, name, apply, filename=None, base=None, name_filter=None, summary=None, finish=None):
+        rule = Rule(name, apply, filename, base, name_filter, summary, finish)
+        self.rules.append(rule)
+        return rule
+
+    def run(self):
+        patcher = self.patcher
+        for filename in list(patcher.file_trees):
+            rules = [r for r in self.rules if r.filename is None or r.filename == filename]
+            if not rules:
+                continue
+
+            content = patcher.file_contents[filename]
+            inheritors = {r.base: set(patcher.get_all_inheritors(r.base)) for r in rules if r.base is not None}
+            seen = set()
+            for struct_name in patcher.get_top_level_structs(filename):
+                if struct_name in seen:
+                    continue
+                seen.add(struct_name)
+
+                matching = [r for r in rules if r.matches(struct_name, inheritors)]
+                if not matching:
+                    continue
+                struct_data = psg.get_struct_content(content, struct_name)
+                if not struct_data:
+                    continue
+                for rule in matching:
+                    if rule.apply(patcher, filename, struct_name, struct_data):
+                        rule.count += 1
+
+            for rule in rules:
+                rule.swept = True
+
+        for rule in self.rules:
+            if rule.swept and rule.finish:
+                rule.finish(patcher)
+            if rule.swept and rule.summary:
+                print(rule.summary.format(count=rule.count))
@@ -3,10 +3,13 @@ import re
 
 import patching_script_general as psg
 from .constants import *
-from .utils import get_npc_base_defaults, get_struct_names
+from .bursts import BurstMatrix, BRACKETS, DEFAULT_RANK_CONFIG
+from .classify import SHOTGUN, SNIPER, PISTOL, SMG
+from .utils import get_npc_base_defaults
 
 
-def patch_npc_vision(patcher):
+def register_npc_vision(engine):
+    patcher = engine.patcher
     inheritors = patcher.get_all_inheritors("NPCBase")
     defaults = get_npc_base_defaults(patcher)
     print(f"DEBUG: Found {len(inheritors)} NPCs inheriting from NPCBase.")
@@ -14,24 +17,12 @@ def patch_npc_vision(patcher):
     vision_multipliers = {"EnemyCouldBeVisibleMaxDistance": VISION_DISTANCE_MULT,
         "LoseEnemyVisibilityTime": VISION_LOSE_TIME_MULT, "CheckEnemyTime": VISION_CHECK_TIME_MULT}
 
-    count = 0
-    for struct_name in inheritors:
+    def include(struct_name):
         if psg.is_special_npc(struct_name) and struct_name != "NPCBase":
-            continue
-        if struct_name == "GunRpg7_GL_NPC":
-            continue
-
-        filename_info = patcher.struct_to_file.get(struct_name)
-        if not filename_info: continue
-        filename, _ = filename_info
-
-        if filename != "GeneralNPCObjPrototypes.cfg":
-            continue
-
-        content = patcher.file_contents[filename]
-        struct_data = psg.get_struct_content(content, struct_name)
-        if not struct_data: continue
+            return False
+        return struct_name != "GunRpg7_GL_NPC"
 
+    def apply(patcher, filename, struct_name, struct_data):
         has_cp_override = re.search(r'CombatParameters\s*:\s*struct\.begin', struct_data, re.IGNORECASE)
         cp_content = psg.get_struct_content(struct_data, "CombatParameters") if has_cp_override else struct_data
 
@@ -45,19 +36,21 @@ def patch_npc_vision(patcher):
                 new_val = v * mult
                 p_props[key] = f"{new_val:.4f}f"
 
-        if p_props:
-            patch = psg.generate_bpatch(struct_name, ["CombatParameters"], values=None, direct_properties=p_props)
-            patcher.add_patch(filename, patch)
-            count += 1
-    print(f"DEBUG: Applied vision patches to {count} structs in GeneralNPCObjPrototypes.cfg")
+        if not p_props:
+            return False
+        patch = psg.BPatch.build(struct_name, ["CombatParameters"], values=None, direct_properties=p_props)
+        patcher.add_patch(filename, patch)
+        return True
+
+    engine.add_rule("npc_vision", apply, filename="GeneralNPCObjPrototypes.cfg", base="NPCBase", name_filter=include,
+                    summary="DEBUG: Applied vision patches to {count} structs in GeneralNPCObjPrototypes.cfg")
 
 
-def patch_vision_scanners(patcher):
+def register_vision_scanners(engine):
     filename = "VisionScannerPrototypes.cfg"
-    content = patcher.file_contents.get(filename)
+    content = engine.patcher.file_contents.get(filename)
     if not content: return
 
-    structs = re.findall(r'^(\w+)\s*:\s*struct\.begin', content, re.MULTILINE)
     base_scanner = "DefaultNPC"
     base_data = psg.get_struct_content(content, base_scanner)
     if not base_data: return
@@ -68,13 +61,10 @@ def patch_vision_scanners(patcher):
         if val is not None:
             scanner_defaults[key] = val
 
-    count = 0
-    for s in structs:
-        if s in ["Player", "NoVision", "ScarBoss", "Boss"]: continue
-        if s == "GunRpg7_GL_NPC":
-            continue
+    def include(s):
+        return s not in ["Player", "NoVision", "ScarBoss", "Boss", "GunRpg7_GL_NPC"]
 
-        data = psg.get_struct_content(content, s)
+    def apply(patcher, filename, s, data):
         props = {}
         for key, base_val in scanner_defaults.items():
             val = psg.get_value(data, key)
@@ -85,317 +75,210 @@ def patch_vision_scanners(patcher):
                 new_val = val * VISION_DISTANCE_MULT
                 props[key] = f"{new_val:.4f}f"
 
-        if props:
-            patcher.add_patch(filename, psg.generate_bpatch(s, direct_properties=props))
-            count += 1
-    print(f"DEBUG: Applied patches to {count} vision scanners in VisionScannerPrototypes.cfg")
-
-
-def patch_weapons(patcher):
-    npc_weapon_file = "NPCWeaponSettingsPrototypes.cfg"
-    npc_content = patcher.file_contents.get(npc_weapon_file)
-
-    if npc_content:
-        shotgun_settings_sids = patcher.get_all_inheritors("TemplateShotgun")
-        sniper_settings_sids = patcher.get_all_inheritors("TemplateSniper")
-        pistol_settings_sids = patcher.get_all_inheritors("TemplatePistol")
-        smg_settings_sids = patcher.get_all_inheritors("TemplateSMG")
-        structs = re.findall(r'^(\w+)\s*:\s*struct\.begin', npc_content, re.MULTILINE)
-        count = 0
-        for s in structs:
-            s_clean = s.strip()
-            if psg.is_special_npc(s_clean): continue
-            if "RPG7" in s_clean.upper():
-                continue
-
-            data = psg.get_struct_content(npc_content, s)
-            if not data: continue
-
-            props = {}
-            if s not in shotgun_settings_sids:
-                is_sniper = s in sniper_settings_sids
-                is_pistol = s in pistol_settings_sids
-                is_smg = s in smg_settings_sids
-
-                disp_mult = NPC_WEAPON_DISPERSION_MULT
-
-                if is_sniper:
-                    disp_mult *= SNIPER_DISPERSION_SCALING
-                elif is_pistol:
-                    disp_mult *= PISTOL_DISPERSION_SCALING
-                elif is_smg:
-                    disp_mult *= SMG_DISPERSION_SCALING
-
-                for key in ["DispersionRadius", "DispersionRadiusZombieAddend"]:
-                    val = psg.get_value(data, key)
-                    if val is not None and isinstance(val, (int, float)):
-                        new_val = val * disp_mult
-                        props[key] = f"{new_val:.2f}"
-
-            orig_bleed = psg.get_value(data, "BaseBleeding")
-            if orig_bleed is not None and isinstance(orig_bleed, (int, float)):
-                n_bleed = BLEEDING_BASE_MULT * orig_bleed + BLEEDING_BASE_ADD
-                props["BaseBleeding"] = f"{n_bleed:.1f}"
-
-            orig_chance = psg.get_value(data, "ChanceBleedingPerShot")
-            if orig_chance is not None and isinstance(orig_chance, (int, float)):
-                n_chance = min(orig_chance * BLEEDING_CHANCE_MULT, orig_chance - BLEEDING_CHANCE_SUB)
-                n_chance = max(BLEEDING_CHANCE_MIN_FLOOR, n_chance)
-                props["ChanceBleedingPerShot"] = f"{round(n_chance * 100)}%"
-
-            if props:
-                patcher.add_patch(npc_weapon_file, psg.generate_bpatch(s, direct_properties=props))
-                count += 1
-        print(
-            f"DEBUG: Applied weapon bleeding/dispersion bpatches to {count} structs in NPCWeaponSettingsPrototypes.cfg")
-
-    player_weapon_file = "PlayerWeaponSettingsPrototypes.cfg"
-    player_content = patcher.file_contents.get(player_weapon_file)
-    if player_content:
-        structs = re.findall(r'^(\w+)\s*:\s*struct\.begin', player_content, re.MULTILINE)
-        count = 0
-        for s in structs:
-            if psg.is_special_npc(s): continue
-            data = psg.get_struct_content(player_content, s)
-            props = {}
-            for key, mult in [("BaseComfort", PLAYER_STEALTH_COMFORT_MULT),
-                              ("FireLoudness", PLAYER_STEALTH_LOUDNESS_MULT)]:
-                val = psg.get_value(data, key)
-                if val is not None and isinstance(val, (int, float)):
-                    new_val = val * mult
-                    props[key] = f"{new_val:.4f}"
-            if props:
-                patcher.add_patch(player_weapon_file, psg.generate_bpatch(s, direct_properties=props))
-                count += 1
-        print(f"DEBUG: Applied stealth patches to {count} structs in PlayerWeaponSettingsPrototypes.cfg")
-
-
-def patch_npc_attributes(patcher, weapon_stats):
-    filename = "NPCWeaponAttributesPrototypes.cfg"
-    content = patcher.file_contents.get(filename)
-    if not content: return
-
-    shotgun_settings_sids = patcher.get_all_inheritors("TemplateShotgun")
-    sniper_settings_sids = patcher.get_all_inheritors("TemplateSniper")
-
-    structs = get_struct_names(content)
-    count = 0
-
-    for s in structs:
-        s_clean = s.strip()
-        if psg.is_special_npc(s_clean): continue
-        if "RPG7" in s_clean.upper():
-            continue
-        data = psg.get_struct_content(content, s)
-
-        ai_params = psg.get_struct_content(data, "AIParameters")
-        if not ai_params: continue
-
-        settings_sid_match = re.search(r'CharacterWeaponSettingsSID\s*=\s*(\w+)', data, re.IGNORECASE)
-        settings_sid = settings_sid_match.group(1) if settings_sid_match else None
-
-        is_shotgun = settings_sid in shotgun_settings_sids if settings_sid else False
-        is_sniper = settings_sid in sniper_settings_sids if settings_sid else False
+        if not props:
+            return False
+        patcher.add_patch(filename, psg.BPatch.build(s, direct_properties=props))
+        return True
 
-        w_stats = weapon_stats.get(settings_sid, {}) if settings_sid else {}
-        if not w_stats and settings_sid:
-            stripped_sid = settings_sid.replace("_NPC", "").replace("_Player", "")
-            w_stats = weapon_stats.get(stripped_sid, {})
+    engine.add_rule("vision_scanners", apply, filename=filename, name_filter=include,
+                    summary="DEBUG: Applied patches to {count} vision scanners in VisionScannerPrototypes.cfg")
 
-        max_ammo = w_stats.get('MaxAmmo', DEFAULT_MAX_AMMO)
-        fsd = w_stats.get('FirstShotDispersionRadius', DEFAULT_FSD)
 
-        behavior_types_full = psg.get_struct_content(ai_params, "BehaviorTypes")
-        if not behavior_types_full: continue
-
-        body = "\n".join(behavior_types_full.splitlines()[1:])
-        indents = re.findall(r'^(\s+)\w+\s*:\s*struct\.begin', body, re.MULTILINE)
-        if not indents: continue
-        min_indent = min(len(i) for i in indents)
-        types = re.findall(rf'^\s{{{min_indent}}}(\w+)\s*:\s*struct\.begin', body, re.MULTILINE)
+def register_weapons(engine, classes):
+    def apply_npc(patcher, filename, s, data):
+        props = {}
+        flags = classes.get(s).flags
+        if not flags & SHOTGUN:
+            disp_mult = npc_dispersion_mult(flags & SNIPER, flags & PISTOL, flags & SMG)
 
-        sid_patch_lines = [f"{s} : struct.begin {{bpatch}}", "   AIParameters : struct.begin {bpatch}",
-            "      BehaviorTypes : struct.begin {bpatch}"]
+            for key in ["DispersionRadius", "DispersionRadiusZombieAddend"]:
+                val = psg.get_value(data, key)
+                if val is not None and isinstance(val, (int, float)):
+                    new_val = val * disp_mult
+                    props[key] = f"{new_val:.2f}"
+
+        orig_bleed = psg.get_value(data, "BaseBleeding")
+        if orig_bleed is not None and isinstance(orig_bleed, (int, float)):
+            n_bleed = BLEEDING_BASE_MULT * orig_bleed + BLEEDING_BASE_ADD
+            props["BaseBleeding"] = f"{n_bleed:.1f}"
+
+        orig_chance = psg.get_value(data, "ChanceBleedingPerShot")
+        if orig_chance is not None and isinstance(orig_chance, (int, float)):
+            n_chance = min(orig_chance * BLEEDING_CHANCE_MULT, orig_chance - BLEEDING_CHANCE_SUB)
+            n_chance = max(BLEEDING_CHANCE_MIN_FLOOR, n_chance)
+            props["ChanceBleedingPerShot"] = f"{round(n_chance * 100)}%"
+
+        if not props:
+            return False
+        patcher.add_patch(filename, psg.BPatch.build(s, direct_properties=props))
+        return True
+
+    def apply_player(patcher, filename, s, data):
+        props = {}
+        for key, mult in [("BaseComfort", PLAYER_STEALTH_COMFORT_MULT),
+                          ("FireLoudness", PLAYER_STEALTH_LOUDNESS_MULT)]:
+            val = psg.get_value(data, key)
+            if val is not None and isinstance(val, (int, float)):
+                new_val = val * mult
+                props[key] = f"{new_val:.4f}"
+        if not props:
+            return False
+        patcher.add_patch(filename, psg.BPatch.build(s, direct_properties=props))
+        return True
+
+    engine.add_rule("npc_weapons", apply_npc, filename="NPCWeaponSettingsPrototypes.cfg",
+                    name_filter=classes.include,
+                    summary="DEBUG: Applied weapon bleeding/dispersion bpatches to {count} structs in NPCWeaponSettingsPrototypes.cfg")
+    engine.add_rule("player_weapons", apply_player, filename="PlayerWeaponSettingsPrototypes.cfg",
+                    name_filter=lambda s: not psg.is_special_npc(s),
+                    summary="DEBUG: Applied stealth patches to {count} structs in PlayerWeaponSettingsPrototypes.cfg")
+
+
+def npc_dispersion_mult(is_sniper, is_pistol, is_smg, base=NPC_WEAPON_DISPERSION_MULT,
+                        sniper_scaling=SNIPER_DISPERSION_SCALING, pistol_scaling=PISTOL_DISPERSION_SCALING,
+                        smg_scaling=SMG_DISPERSION_SCALING):
+    """Multiplier applied to an NPC weapon's DispersionRadius, by weapon class."""
+    if is_sniper:
+        return base * sniper_scaling
+    if is_pistol:
+        return base * pistol_scaling
+    if is_smg:
+        return base * smg_scaling
+    return base
+
+
+def fire_distance(dist_max, dist_min, range_mult, is_sniper, is_shotgun, norm_k=NORM_K, cap_std=RANGE_CAP_STD,
+                  cap_sniper=RANGE_CAP_SNIPER):
+    """
+    New CombatEffectiveFireDistanceMax for a rank, and the new Min if the old one would no longer fit
+    under it (else None).
+    """
+    if is_shotgun:
+        new_dist_max = dist_max * range_mult * SHOTGUN_MAX_DIST_MULT
+
+    else:
+        # Asymptotic Normalization
+        # Input: Base distance * Rank Multiplier
+        # Output: Cap * (1 - exp(-Input * k))
+
+        input_dist = dist_max * range_mult
+
+        cap = cap_sniper if is_sniper else cap_std
+
+        # Formula: Cap * (1 - e^(-Input * k))
+        new_dist_max = cap * (1 - math.exp(-input_dist * norm_k))
+
+    current_min = dist_min if dist_min is not None else 0
+    if new_dist_max <= current_min:
+        return new_dist_max, new_dist_max * MIN_DIST_FACTOR
+    return new_dist_max, None
+
+
+def read_npc_weapon(data, classes):
+    """
+    Reads what the npc_attributes logic needs from one NPCWeaponAttributesPrototypes struct.
+    Returns (settings_sid, is_sniper, is_shotgun, max_ammo, fsd, ranks) or None if it has no
+    BehaviorTypes, where ranks lists (rank, CombatEffectiveFireDistanceMax, CombatEffectiveFireDistanceMin,
+    brackets) and brackets lists (bracket, MinShots, MaxShots, IgnoreDispersionMinShots,
+    IgnoreDispersionMaxShots).
+    """
+    ai_params = psg.get_struct_content(data, "AIParameters")
+    if not ai_params: return None
+
+    settings_sid = psg.get_value(data, "CharacterWeaponSettingsSID", deep=True)
+    if not isinstance(settings_sid, str) or not settings_sid:
+        settings_sid = None
+
+    weapon = classes.get(settings_sid) if settings_sid else None
+    is_shotgun = bool(weapon.flags & SHOTGUN) if weapon else False
+    is_sniper = bool(weapon.flags & SNIPER) if weapon else False
+    w_stats = weapon.stats if weapon else {}
+
+    max_ammo = w_stats.get('MaxAmmo', DEFAULT_MAX_AMMO)
+    fsd = w_stats.get('FirstShotDispersionRadius', DEFAULT_FSD)
+
+    behavior_types_full = psg.get_struct_content(ai_params, "BehaviorTypes")
+    if not behavior_types_full: return None
+
+    # Rank blocks are the named children of BehaviorTypes; a repeated rank only counts the first time
+    rank_nodes = {}
+    for child in behavior_types_full.node.children:
+        if not child.name.startswith('['):
+            rank_nodes.setdefault(child.name, child)
+    if not rank_nodes: return None
+
+    ranks = []
+    for t, rank_node in rank_nodes.items():
+        t_data = psg.StructText.wrap(behavior_types_full.source, rank_node, behavior_types_full.root)
+        brackets = []
+        for bracket in BRACKETS:
+            b_data = psg.get_struct_content(t_data, bracket)
+            if not b_data: continue
+            brackets.append((bracket, psg.get_value(b_data, "MinShots") or 1, psg.get_value(b_data, "MaxShots") or 1,
+                             psg.get_value(b_data, "IgnoreDispersionMinShots") or 0,
+                             psg.get_value(b_data, "IgnoreDispersionMaxShots") or 0))
+        ranks.append((t, psg.get_value(t_data, "CombatEffectiveFireDistanceMax"),
+                      psg.get_value(t_data, "CombatEffectiveFireDistanceMin"), brackets))
+    return settings_sid, is_sniper, is_shotgun, max_ammo, fsd, ranks
+
+
+def register_npc_attributes(engine, classes):
+    matrix = BurstMatrix()
+    pending_brackets = []  # (matrix row, bracket BPatch, whether MinShots/MaxShots are patched)
+    pending_patches = []  # (filename, SID BPatch), added once the matrix is computed
+
+    def apply(patcher, filename, s, data):
+        weapon = read_npc_weapon(data, classes)
+        if weapon is None: return False
+        _, is_sniper, is_shotgun, max_ammo, fsd, ranks = weapon
+
+        sid_patch = psg.BPatch(s)
+        behavior_patch = sid_patch.node("AIParameters").node("BehaviorTypes")
         has_any_sid_change = False
 
-        for t in types:
-            t_data = psg.get_struct_content(behavior_types_full, t)
-            config = RANK_CONFIGS.get(t, {"range_mult": 1.5, "burst_logic": {}})
-            blogic = config.get("burst_logic", {})
+        for t, dist_max, dist_min, brackets in ranks:
+            config = RANK_CONFIGS.get(t, DEFAULT_RANK_CONFIG)
 
-            rank_lines = [f"         {t} : struct.begin {{bpatch}}"]
+            rank_patch = psg.BPatch(t)
             has_any_rank_change = False
 
-            dist_max = psg.get_value(t_data, "CombatEffectiveFireDistanceMax")
-            dist_min = psg.get_value(t_data, "CombatEffectiveFireDistanceMin")
             if dist_max:
-                if is_shotgun:
-                    new_dist_max = dist_max * config['range_mult'] * SHOTGUN_MAX_DIST_MULT
-
-                else:
-                    # Asymptotic Normalization
-                    # Input: Base distance * Rank Multiplier
-                    # Output: Cap * (1 - exp(-Input * k))
-
-                    input_dist = dist_max * config['range_mult']
-
-                    cap = RANGE_CAP_SNIPER if is_sniper else RANGE_CAP_STD
-
-                    # Formula: Cap * (1 - e^(-Input * k))
-                    new_dist_max = cap * (1 - math.exp(-input_dist * NORM_K))
-
-                current_min = dist_min if dist_min is not None else 0
-                if new_dist_max <= current_min:
-                    new_min = new_dist_max * MIN_DIST_FACTOR
-                    rank_lines.append(f"            CombatEffectiveFireDistanceMin = {new_min:.1f}")
-
-                rank_lines.append(f"            CombatEffectiveFireDistanceMax = {new_dist_max:.1f}")
+                new_dist_max, new_dist_min = fire_distance(dist_max, dist_min, config['range_mult'], is_sniper,
+                                                           is_shotgun)
+                if new_dist_min is not None:
+                    rank_patch.set("CombatEffectiveFireDistanceMin", f"{new_dist_min:.1f}")
+                rank_patch.set("CombatEffectiveFireDistanceMax", f"{new_dist_max:.1f}")
                 has_any_rank_change = True
 
-            process_dispersion = not is_shotgun
-            process_burst = not is_sniper and not is_shotgun
-
-            for bracket in ["Short", "Medium", "Long"]:
-                b_data = psg.get_struct_content(t_data, bracket)
-                if not b_data: continue
-
-                orig_min = psg.get_value(b_data, "MinShots") or 1
-                orig_max = psg.get_value(b_data, "MaxShots") or 1
-                new_min, new_max = orig_min, orig_max
-
-                if process_burst:
-                    base_mult = blogic.get("burst_mult", 1.0)
-                    mult_min = base_mult
-                    mult_max = base_mult
-
-                    if bracket == "Long":
-                        mult_max *= blogic.get("long_burst_mult", 1.0)
-                        # Use min_long_burst_mult if avail, else fallback to long_burst_mult
-                        mult_min *= blogic.get("min_long_burst_mult", blogic.get("long_burst_mult", 1.0))
-                    elif bracket == "Medium":
-                        mult_max *= blogic.get("medium_burst_mult", 1.0)
-                        mult_min = mult_max
-                    elif bracket == "Short":
-                        mult_max *= blogic.get("short_burst_mult", 1.0)
-                        mult_min = mult_max
-
-                    new_min = int(orig_min * mult_min) + blogic.get("min_add", 0)
-                    new_max = int(orig_max * mult_max) + blogic.get("max_add", 0)
-
-                    if mult_max > 1.0 and new_max == orig_max:
-                        new_max += 1
-
-                    if t == "Master" and bracket == "Long":
-                        limit_min_val = max(1, int(max_ammo * 0.05))
-                        limit_max_val = max(1, int(max_ammo * 0.10))
-
-                        limit_min = min(2, limit_min_val)
-                        limit_max = min(3, limit_max_val)
-
-                        new_min = min(new_min, limit_min)
-                        new_max = min(new_max, limit_max)
-
-                    # Ensure Min < Max (User requirement) regardless of clamping
-                    if new_min >= new_max:
-                        new_max = new_min + 1
-
-                    new_max = min(new_max, max_ammo)
-                    new_min = min(new_min, new_max)
-
-                    # If after clamping to max_ammo, Min >= Max (meaning both hit ceiling), reduce Min
-                    if new_min >= new_max and new_min > 1:
-                        new_min = new_max - 1
-
-                    if new_min < 1: new_min = 1
-                    if new_max < new_min: new_max = new_min + 1
-
-                ignore_min, ignore_max = None, None
-                if process_dispersion:
-                    floor_min = config.get("ignore_disp_min", {}).get(bracket, 0)
-                    floor_max = config.get("ignore_disp_max", {}).get(bracket, 0)
-                    chance_min = config.get("ignore_disp_chance_min", {}).get(bracket, 0)
-                    chance_max = config.get("ignore_disp_chance_max", {}).get(bracket, 0)
-
-                    ignore_min = max(floor_min, int(new_min * chance_min))
-                    ignore_max = max(floor_max, int(new_min * chance_max))
-
-                    if blogic.get("ignore_disp_max_inc_if_small") and new_max < IGNORE_DISP_LOW_AMMO_THRESHOLD:
-                        ignore_max += 1
-
-                    if bracket == "Long": ignore_max += blogic.get("guaranteed_add_long", 0)
-                    if bracket == "Medium":
-                        ignore_min += blogic.get("guaranteed_add_medium_min", 0)
-                        ignore_max += blogic.get("guaranteed_add_medium_max", 0)
-
-                    if t == "Master":
-                        if bracket == "Long":
-                            ignore_min += blogic.get("guaranteed_add_long_min", 0)
-                            ignore_max += blogic.get("guaranteed_add_long_max", 0)
-                        elif bracket == "Medium":
-                            ignore_min += blogic.get("guaranteed_add_medium_min", 0)
-                            ignore_max += blogic.get("guaranteed_add_medium_max", 0)
-                        elif bracket == "Short":
-                            mag_floor = int(max_ammo * blogic.get("guaranteed_add_short_mag_pct", 0))
-                            ignore_min = max(ignore_min, mag_floor)
-                            ignore_max = max(ignore_max, mag_floor)
-
-                    if is_sniper:
-                        if t == "Experienced":
-                            if bracket == "Short":
-                                ignore_max = 1
-                            elif bracket == "Medium":
-                                ignore_max = 1
-                            elif bracket == "Long":
-                                ignore_max = 0  # No chance for Experienced at Long
-                        elif t == "Veteran":
-                            if bracket == "Short":
-                                ignore_min = 1
-                                ignore_max = 1
-                            else:  # Medium and Long
-                                ignore_max = 1  # Chance to hit (might miss)
-                                ignore_min = 0
-                        elif t == "Master":
-                            ignore_max = 1  # Always a chance (might miss)
-                            if bracket in ["Short", "Medium"]:
-                                ignore_min = 1  # Guaranteed hit (1/1)
-                            else:
-                                ignore_min = 0  # Might miss (0/1)
-
-                    if t == "Zombie":
-                        ignore_max = 1
-
-                    if t == "Master" and bracket == "Long" and not is_sniper:
-                        original_ignore_max = psg.get_value(b_data, "IgnoreDispersionMaxShots") or 0
-                        if fsd < MASTER_FSD_THRESHOLD:
-                            ignore_max = max(1, original_ignore_max)
-                        else:
-                            ignore_max = max(0, original_ignore_max - 1)
-
-                    ignore_max = min(ignore_max, new_max)
-                    ignore_min = min(ignore_min, ignore_max)
-
-                bracket_lines = []
-                if process_burst:
-                    bracket_lines.append(f"               MinShots = {new_min}")
-                    bracket_lines.append(f"               MaxShots = {new_max}")
-                if process_dispersion:
-                    bracket_lines.append(f"               IgnoreDispersionMinShots = {ignore_min}")
-                    bracket_lines.append(f"               IgnoreDispersionMaxShots = {ignore_max}")
-
-                if bracket_lines:
-                    rank_lines.append(f"            {bracket} : struct.begin {{bpatch}}")
-                    rank_lines.extend(bracket_lines)
-                    rank_lines.append(f"            struct.end")
-                    has_any_rank_change = True
+            for bracket, orig_min, orig_max, _, orig_ignore_max in brackets:
+                if is_shotgun: break  # Shotguns keep their bursts and dispersion
+                row = matrix.add_row(t, bracket, config, orig_min, orig_max, orig_ignore_max, max_ammo, fsd,
+                                     is_sniper, is_shotgun)
+                pending_brackets.append((row, rank_patch.node(bracket), not is_sniper))
+                has_any_rank_change = True
 
             if has_any_rank_change:
-                rank_lines.append("         struct.end")
-                sid_patch_lines.extend(rank_lines)
+                behavior_patch.add(rank_patch)
                 has_any_sid_change = True
 
-        if has_any_sid_change:
-            sid_patch_lines.extend(["      struct.end", "   struct.end", "struct.end"])
-            patcher.add_patch(filename, "\n".join(sid_patch_lines))
-            count += 1
-
-    print(f"DEBUG: Applied logic patches to {count} weapons in NPCWeaponAttributesPrototypes.cfg")
+        if not has_any_sid_change:
+            return False
+        pending_patches.append((filename, sid_patch))
+        return True
+
+    def finish(patcher):
+        # Every bracket of every weapon is computed in one go, then written into its queued patch
+        results = matrix.compute()
+        for row, bracket_patch, process_burst in pending_brackets:
+            new_min, new_max, ignore_min, ignore_max = results[row]
+            if process_burst:
+                bracket_patch.set("MinShots", new_min)
+                bracket_patch.set("MaxShots", new_max)
+            bracket_patch.set("IgnoreDispersionMinShots", ignore_min)
+            bracket_patch.set("IgnoreDispersionMaxShots", ignore_max)
+        for filename, sid_patch in pending_patches:
+            patcher.add_patch(filename, sid_patch)
+
+    engine.add_rule("npc_attributes", apply, filename="NPCWeaponAttributesPrototypes.cfg",
+                    name_filter=classes.include, finish=finish,
+                    summary="DEBUG: Applied logic patches to {count} weapons in NPCWeaponAttributesPrototypes.cfg")
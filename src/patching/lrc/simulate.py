@@ -0,0 +1,217 @@
+import sys
+import time
+import argparse
+
+try:
+    import numpy as np
+except ImportError:  # Optional: only this tool needs it
+    np = None
+
+import patching_script_general as psg
+from dump_catalog import open_catalog
+from patch_config import SOURCE_DUMP, PARSE_CACHE_DIR, CATALOG_DB, get_mod_root, LRC_FILES
+from .constants import *
+from .bursts import BurstMatrix, BRACKETS, DEFAULT_RANK_CONFIG
+from .engine import RuleEngine
+from .classify import WeaponClasses, PISTOL, SMG
+from .logic import read_npc_weapon, fire_distance, npc_dispersion_mult
+from .utils import load_weapon_stats_map
+
+# Engagement model. These are assumptions for comparing vanilla and patched values, not game data.
+TARGET_RADIUS = 40.0  # cm, a torso-sized disc
+DISPERSION_REFERENCE_DISTANCE = 1000.0  # cm at which a shot lands within DispersionRadius of the aim point
+HITS_TO_KILL = 5
+MAX_BURSTS = 30  # engagements still alive after this many bursts count as no kill
+BURST_SECONDS = 1.5  # one burst plus the pause before the next
+# Engagement distance per bracket, as a fraction of CombatEffectiveFireDistanceMax
+BRACKET_BANDS = {"Short": (0.0, 1 / 3), "Medium": (1 / 3, 2 / 3), "Long": (2 / 3, 1.0)}
+
+# Per-row inputs of a variant (vanilla or patched), one column each
+COLUMNS = ["min_shots", "max_shots", "ignore_min", "ignore_max", "dispersion", "distance"]
+
+
+def collect_rows(patcher, classes):
+    """
+    Returns one (sid, rank, bracket, vanilla, patched) row per BehaviorTypes bracket of every NPC weapon,
+    with vanilla and patched as tuples in COLUMNS order. Patched values come from the same functions
+    the mod runs; inherited DispersionRadius and fire distances are resolved through the refkey chain.
+    """
+    weapons = []
+
+    def read_attributes(patcher, filename, s, data):
+        weapon = read_npc_weapon(data, classes)
+        if weapon is None:
+            return False
+        weapons.append((s, weapon))
+        return True
+
+    engine = RuleEngine(patcher)
+    engine.add_rule("simulate_npc_attributes", read_attributes, filename="NPCWeaponAttributesPrototypes.cfg",
+                    name_filter=classes.include, summary="DEBUG: Read {count} NPC weapon attributes.")
+    engine.run()
+
+    matrix = BurstMatrix()
+    pending = []  # (sid, rank, bracket, vanilla, patched without shots, matrix row or None)
+    for s, (settings_sid, is_sniper, is_shotgun, max_ammo, fsd, ranks) in weapons:
+        radius = patcher.get_effective_value(settings_sid, "DispersionRadius") if settings_sid else None
+        if not isinstance(radius, (int, float)):
+            continue
+        patched_radius = radius
+        if not is_shotgun:
+            flags = classes.get(settings_sid).flags
+            patched_radius = radius * npc_dispersion_mult(is_sniper, flags & PISTOL, flags & SMG)
+
+        for t, dist_max, dist_min, brackets in ranks:
+            config = RANK_CONFIGS.get(t, DEFAULT_RANK_CONFIG)
+            if dist_max:
+                patched_dist = fire_distance(dist_max, dist_min, config['range_mult'], is_sniper, is_shotgun)[0]
+            else:
+                dist_max = patcher.get_effective_value(s, "CombatEffectiveFireDistanceMax",
+                                                       ["AIParameters", "BehaviorTypes", t])
+                patched_dist = dist_max
+            if not isinstance(dist_max, (int, float)) or dist_max <= 0:
+                continue
+
+            for bracket, orig_min, orig_max, orig_ignore_min, orig_ignore_max in brackets:
+                vanilla = (orig_min, orig_max, orig_ignore_min, orig_ignore_max, radius, dist_max)
+                row = None
+                if not is_shotgun:
+                    row = matrix.add_row(t, bracket, config, orig_min, orig_max, orig_ignore_max, max_ammo, fsd,
+                                         is_sniper, is_shotgun)
+                pending.append((s, t, bracket, vanilla, (patched_radius, patched_dist), row))
+
+    results = matrix.compute()
+    rows = []
+    for s, t, bracket, vanilla, (patched_radius, patched_dist), row in pending:
+        shots = results[row] if row is not None else vanilla[:4]  # Shotguns keep theirs
+        rows.append((s, t, bracket, vanilla, tuple(shots) + (patched_radius, patched_dist)))
+    return rows
+
+
+def simulate(variant, bands, samples, rng, hits_to_kill=HITS_TO_KILL, max_bursts=MAX_BURSTS):
+    """
+    Samples `samples` engagements per row. Each engagement picks a distance in its bracket's band and
+    fires bursts at it: a burst has MinShots..MaxShots shots, IgnoreDispersionMin..MaxShots of them
+    (capped at the burst) hit for sure, the rest hit when they land inside TARGET_RADIUS of a disc of
+    DispersionRadius scaled by distance. variant is a (rows, len(COLUMNS)) array, bands a (rows, 2) array.
+    Returns (hits in the first burst, bursts to kill or 0 if still alive), both (rows, samples).
+    """
+    shape = (len(variant), samples)
+    col = {name: np.broadcast_to(variant[:, i:i + 1], shape).ravel() for i, name in enumerate(COLUMNS)}
+    min_shots = col["min_shots"].astype(np.int64)
+    max_shots = np.maximum(col["max_shots"], col["min_shots"]).astype(np.int64) + 1
+    ignore_min = col["ignore_min"].astype(np.int64)
+    ignore_max = np.maximum(col["ignore_max"], col["ignore_min"]).astype(np.int64) + 1
+
+    distance = col["distance"] * rng.uniform(np.broadcast_to(bands[:, 0:1], shape).ravel(),
+                                             np.broadcast_to(bands[:, 1:2], shape).ravel())
+    spread = col["dispersion"] * distance / DISPERSION_REFERENCE_DISTANCE
+    # Uniform over the spread disc: P(hit) is the share of its area covered by the target
+    p_hit = np.minimum(1.0, (TARGET_RADIUS / np.maximum(spread, 1e-9)) ** 2)
+
+    first_hits = None
+    total = np.zeros(min_shots.size, dtype=np.int64)
+    bursts_to_kill = np.zeros(min_shots.size, dtype=np.int64)
+    alive = np.arange(min_shots.size)  # Only engagements still going are sampled again
+    for burst in range(1, max_bursts + 1):
+        shots = rng.integers(min_shots[alive], max_shots[alive])
+        guaranteed = np.minimum(rng.integers(ignore_min[alive], ignore_max[alive]), shots)
+        hits = guaranteed + rng.binomial(shots - guaranteed, p_hit[alive])
+        if first_hits is None:
+            first_hits = hits.reshape(shape)
+        total[alive] += hits
+        killed = total[alive] >= hits_to_kill
+        bursts_to_kill[alive[killed]] = burst
+        alive = alive[~killed]
+        if not alive.size:
+            break
+    bursts_to_kill = bursts_to_kill.reshape(shape)
+    return first_hits, bursts_to_kill
+
+
+def summarize(first_hits, bursts_to_kill):
+    """Mean hits per burst, share of bursts with a hit, kill share and median/p90 time to kill in seconds."""
+    killed = bursts_to_kill[bursts_to_kill > 0]
+    ttk = killed * BURST_SECONDS
+    return {"hits": float(first_hits.mean()), "any_hit": float((first_hits > 0).mean()),
+            "kill": killed.size / bursts_to_kill.size,
+            "ttk_p50": float(np.median(ttk)) if killed.size else None,
+            "ttk_p90": float(np.percentile(ttk, 90)) if killed.size else None}
+
+
+def format_seconds(value):
+    return "-" if value is None else f"{value:.1f}s"
+
+
+def build_report(rows, samples, seed, by_sid=False):
+    """Simulates vanilla and patched values of every row and returns a Markdown comparison."""
+    rng = np.random.default_rng(seed)
+    bands = np.array([BRACKET_BANDS[bracket] for _, _, bracket, _, _ in rows], dtype=np.float64)
+    vanilla = np.array([r[3] for r in rows], dtype=np.float64)
+    patched = np.array([r[4] for r in rows], dtype=np.float64)
+
+    # Rows are grouped per report line; every group is simulated in one go
+    groups = {}
+    for i, (s, t, bracket, _, _) in enumerate(rows):
+        groups.setdefault((s, t, bracket) if by_sid else (t, bracket), []).append(i)
+
+    output = []
+    output.append("# Engagement Simulation: Vanilla vs Patched")
+    output.append(f"{samples} engagements per SID/rank/bracket. Target radius {TARGET_RADIUS:g}cm, "
+                  f"{HITS_TO_KILL} hits to kill, {BURST_SECONDS:g}s per burst, at most {MAX_BURSTS} bursts.")
+    output.append("")
+    key_header = "| SID | Rank | Bracket |" if by_sid else "| Rank | Bracket |"
+    output.append(f"{key_header} Hits/Burst | Bursts with a Hit | Killed | TTK p50 | TTK p90 |")
+    output.append("| :--- " * (len(key_header.split("|")) - 2) + "| :--- | :--- | :--- | :--- | :--- |")
+
+    def rank_order(key):
+        rank, bracket = key[-2], key[-1]
+        ranks = list(RANK_CONFIGS)
+        return (key[:-2], ranks.index(rank) if rank in ranks else len(ranks), BRACKETS.index(bracket))
+
+    for key in sorted(groups, key=rank_order):
+        index = np.array(groups[key])
+        v, p = [summarize(*simulate(variant[index], bands[index], samples, rng)) for variant in (vanilla, patched)]
+        cells = [f"{v['hits']:.2f} -> {p['hits']:.2f}", f"{v['any_hit']:.0%} -> {p['any_hit']:.0%}",
+                 f"{v['kill']:.0%} -> {p['kill']:.0%}",
+                 f"{format_seconds(v['ttk_p50'])} -> {format_seconds(p['ttk_p50'])}",
+                 f"{format_seconds(v['ttk_p90'])} -> {format_seconds(p['ttk_p90'])}"]
+        output.append(f"| {' | '.join(list(key) + cells)} |")
+    output.append("")
+    return "\n".join(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo comparison of vanilla and patched NPC engagements.")
+    parser.add_argument("--samples", type=int, default=10000, help="Engagements per SID/rank/bracket and variant")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--by-sid", action="store_true", help="One report line per SID instead of per rank/bracket")
+    parser.add_argument("--out", help="Write the Markdown report here instead of printing it")
+    args = parser.parse_args()
+
+    if np is None:
+        print("Error: the engagement simulator needs numpy (pip install numpy).")
+        return 1
+
+    patcher = psg.ModPatcher(SOURCE_DUMP, get_mod_root("LongRangeCombat"), PARSE_CACHE_DIR,
+                             catalog=open_catalog(CATALOG_DB), lazy=True)
+    patcher.load_files(LRC_FILES)
+    rows = collect_rows(patcher, WeaponClasses(patcher, load_weapon_stats_map(patcher)))
+    if not rows:
+        print("Error: no NPC weapon brackets with a DispersionRadius and fire distance found.")
+        return 1
+
+    started = time.perf_counter()
+    report = build_report(rows, args.samples, args.seed, args.by_sid)
+    print(f"DEBUG: Simulated {2 * len(rows) * args.samples} engagements in {time.perf_counter() - started:.1f}s.")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(report)
+        print(f"Engagement report written to {args.out}")
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import os
+import sys
+import csv
+import argparse
+import itertools
+import statistics
+import concurrent.futures
+
+import patching_script_general as psg
+from dump_catalog import open_catalog
+from patch_config import SOURCE_DUMP, PARSE_CACHE_DIR, CATALOG_DB, get_mod_root, LRC_FILES
+from .constants import *
+from .curves import CURVE_PARAMS, get_rank_configs
+from .bursts import BurstMatrix, DEFAULT_RANK_CONFIG
+from .engine import RuleEngine
+from .classify import WeaponClasses, SHOTGUN, SNIPER, PISTOL, SMG
+from .logic import read_npc_weapon, fire_distance, npc_dispersion_mult
+from .utils import load_weapon_stats_map
+
+# Everything a sweep can vary, with the values the mod currently ships
+SWEEP_PARAMS = dict(CURVE_PARAMS, NORM_K=NORM_K, RANGE_CAP_STD=RANGE_CAP_STD, RANGE_CAP_SNIPER=RANGE_CAP_SNIPER,
+                    NPC_WEAPON_DISPERSION_MULT=NPC_WEAPON_DISPERSION_MULT,
+                    SNIPER_DISPERSION_SCALING=SNIPER_DISPERSION_SCALING,
+                    PISTOL_DISPERSION_SCALING=PISTOL_DISPERSION_SCALING, SMG_DISPERSION_SCALING=SMG_DISPERSION_SCALING)
+
+# Summarized outputs: CombatEffectiveFireDistanceMax, MinShots, MaxShots, IgnoreDispersionMin/MaxShots, DispersionRadius
+METRICS = ["range", "min_shots", "max_shots", "ignore_min", "ignore_max", "dispersion"]
+
+_inputs = None  # Set in each worker by _init_worker
+
+
+def collect_inputs(patcher, classes):
+    """
+    Sweeps the loaded files once and returns what every combination is evaluated on: the
+    read_npc_weapon tuples of NPCWeaponAttributesPrototypes and the (DispersionRadius, is_sniper,
+    is_pistol, is_smg) of every non-shotgun NPC weapon setting.
+    """
+    weapons = []
+    dispersions = []
+
+    def read_attributes(patcher, filename, s, data):
+        weapon = read_npc_weapon(data, classes)
+        if weapon is None:
+            return False
+        weapons.append(weapon)
+        return True
+
+    def read_settings(patcher, filename, s, data):
+        flags = classes.get(s).flags
+        if flags & SHOTGUN:
+            return False
+        val = psg.get_value(data, "DispersionRadius")
+        if val is None or not isinstance(val, (int, float)):
+            return False
+        dispersions.append((val, bool(flags & SNIPER), bool(flags & PISTOL), bool(flags & SMG)))
+        return True
+
+    engine = RuleEngine(patcher)
+    engine.add_rule("sweep_npc_attributes", read_attributes, filename="NPCWeaponAttributesPrototypes.cfg",
+                    name_filter=classes.include, summary="DEBUG: Read {count} NPC weapon attributes.")
+    engine.add_rule("sweep_npc_weapons", read_settings, filename="NPCWeaponSettingsPrototypes.cfg",
+                    name_filter=classes.include, summary="DEBUG: Read {count} NPC weapon dispersions.")
+    engine.run()
+    return weapons, dispersions
+
+
+def distribution(metric, values):
+    """Min, median, max and mean of one metric as summary table columns."""
+    if not values:
+        return {f"{metric}_{stat}": "" for stat in ("min", "p50", "max", "mean")}
+    return {f"{metric}_min": round(min(values), 3), f"{metric}_p50": round(statistics.median(values), 3),
+            f"{metric}_max": round(max(values), 3), f"{metric}_mean": round(statistics.fmean(values), 3)}
+
+
+def evaluate(params, inputs=None):
+    """Computes the LRC outputs of one parameter combination and returns its summary table row."""
+    weapons, dispersions = inputs if inputs is not None else _inputs
+    rank_configs = get_rank_configs(**{k: params[k] for k in CURVE_PARAMS})
+    values = {metric: [] for metric in METRICS}
+
+    matrix = BurstMatrix()
+    for _, is_sniper, is_shotgun, max_ammo, fsd, ranks in weapons:
+        for t, dist_max, dist_min, brackets in ranks:
+            config = rank_configs.get(t, DEFAULT_RANK_CONFIG)
+            if dist_max:
+                new_dist_max, _ = fire_distance(dist_max, dist_min, config['range_mult'], is_sniper, is_shotgun,
+                                                params["NORM_K"], params["RANGE_CAP_STD"], params["RANGE_CAP_SNIPER"])
+                values["range"].append(new_dist_max)
+            for bracket, orig_min, orig_max, _, orig_ignore_max in brackets:
+                if is_shotgun: break  # Not patched
+                matrix.add_row(t, bracket, config, orig_min, orig_max, orig_ignore_max, max_ammo, fsd, is_sniper,
+                               is_shotgun)
+
+    for new_min, new_max, ignore_min, ignore_max in matrix.compute():
+        values["min_shots"].append(new_min)
+        values["max_shots"].append(new_max)
+        values["ignore_min"].append(ignore_min)
+        values["ignore_max"].append(ignore_max)
+
+    for radius, is_sniper, is_pistol, is_smg in dispersions:
+        values["dispersion"].append(radius * npc_dispersion_mult(
+            is_sniper, is_pistol, is_smg, params["NPC_WEAPON_DISPERSION_MULT"], params["SNIPER_DISPERSION_SCALING"],
+            params["PISTOL_DISPERSION_SCALING"], params["SMG_DISPERSION_SCALING"]))
+
+    row = dict(params)
+    for metric in METRICS:
+        row.update(distribution(metric, values[metric]))
+    return row
+
+
+def _init_worker(inputs):
+    global _inputs
+    _inputs = inputs
+
+
+def parse_grid(spec):
+    """Parses NAME=v1,v2,... or NAME=start:stop:count (count evenly spaced values, both ends included)."""
+    name, sep, values = spec.partition("=")
+    if not sep or name not in SWEEP_PARAMS:
+        raise ValueError(f"Bad grid '{spec}'. Parameters: {', '.join(SWEEP_PARAMS)}")
+    if ":" in values:
+        start, stop, count = values.split(":")
+        start, stop, count = float(start), float(stop), int(count)
+        if count < 2:
+            return name, [start]
+        return name, [float(f"{start + (stop - start) * i / (count - 1):.12g}") for i in range(count)]
+    return name, [float(v) for v in values.split(",")]
+
+
+def combinations(grids):
+    """Yields a full SWEEP_PARAMS dict for every combination of the grids, in grid order."""
+    names = [name for name, _ in grids]
+    for combo in itertools.product(*(values for _, values in grids)):
+        params = dict(SWEEP_PARAMS)
+        params.update(zip(names, combo))
+        yield params
+
+
+def run_sweep(inputs, combos, jobs):
+    """Evaluates every combination, spread over a process pool unless jobs is 1. Rows keep combination order."""
+    if jobs <= 1 or len(combos) <= 1:
+        return [evaluate(params, inputs) for params in combos]
+    chunksize = max(1, len(combos) // (jobs * 4))
+    with concurrent.futures.ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(inputs,)) as pool:
+        return list(pool.map(evaluate, combos, chunksize=chunksize))
+
+
+def write_table(path, rows, swept):
+    """Writes the swept parameters and the metric distributions of every combination as CSV."""
+    columns = swept + [f"{metric}_{stat}" for metric in METRICS for stat in ("min", "p50", "max", "mean")]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate LongRangeCombat outputs over grids of tuning parameters.")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=VALUES",
+                        help="Values of one parameter: v1,v2,... or start:stop:count. Repeat for more parameters. "
+                             f"Parameters: {', '.join(SWEEP_PARAMS)}")
+    parser.add_argument("--out", default="lrc_sweep.csv", help="Summary table path (CSV)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    try:
+        grids = [parse_grid(spec) for spec in args.grid]
+    except ValueError as e:
+        parser.error(str(e))
+    swept = [name for name, _ in grids]
+    if len(set(swept)) != len(swept):
+        parser.error("Each parameter can only be given one grid.")
+
+    patcher = psg.ModPatcher(SOURCE_DUMP, get_mod_root("LongRangeCombat"), PARSE_CACHE_DIR,
+                             catalog=open_catalog(CATALOG_DB), lazy=True)
+    patcher.load_files(LRC_FILES)
+    inputs = collect_inputs(patcher, WeaponClasses(patcher, load_weapon_stats_map(patcher)))
+
+    combos = list(combinations(grids))
+    jobs = min(args.jobs or os.cpu_count() or 1, len(combos))
+    fixed = {name: value for name, value in SWEEP_PARAMS.items() if name not in swept}
+    print(f"Evaluating {len(combos)} combinations with {jobs} workers. Fixed: "
+          + ", ".join(f"{name}={value}" for name, value in fixed.items()))
+    rows = run_sweep(inputs, combos, jobs)
+    write_table(args.out, rows, swept)
+    print(f"Summary of {len(rows)} combinations written to {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,44 +1,55 @@
 import os
-import re
+import weakref
 
 import patching_script_general as psg
-from patch_config import SOURCE_DUMP
 
 
-def load_weapon_stats_map(patcher):
-    """Parses WeaponGeneralSetupPrototypes.cfg to map SIDs to MaxAmmo, RecoilRadius, and FirstShotDispersionRadius."""
-    filepath = os.path.join(SOURCE_DUMP, "Content/GameLite/GameData/WeaponData/WeaponGeneralSetupPrototypes.cfg")
-    if not os.path.exists(filepath):
-        print(f"DEBUG: {filepath} not found.")
-        return {}
+WEAPON_SETUP_PATH = "Content/GameLite/GameData/WeaponData/WeaponGeneralSetupPrototypes.cfg"
+WEAPON_STATS = {"MaxAmmo": int, "RecoilRadius": float, "FirstShotDispersionRadius": float}
 
-    with open(filepath, 'r') as f:
-        content = f.read()
+# DumpRegistry -> {(catalog DB, loaded SID mapping): (rel_paths read, stats map)}. A registry's files never
+# change, so the map only depends on which files the patcher has loaded and the catalog it can load more from.
+_weapon_stats_cache = weakref.WeakKeyDictionary()
 
-    stats_map = {}
-    current_sid = None
-    for line in content.splitlines():
-        sid_match = re.search(r'SID\s*=\s*(\w+)', line)
-        if sid_match:
-            current_sid = sid_match.group(1)
-            if current_sid not in stats_map:
-                stats_map[current_sid] = {}
 
-        # MaxAmmo
-        ammo_match = re.search(r'^\s*MaxAmmo\s*=\s*(\d+)', line, re.IGNORECASE)
-        if ammo_match and current_sid:
-            stats_map[current_sid]['MaxAmmo'] = int(ammo_match.group(1))
-
-        # RecoilRadius
-        recoil_match = re.search(r'^\s*RecoilRadius\s*=\s*([\d\.]+)', line, re.IGNORECASE)
-        if recoil_match and current_sid:
-            stats_map[current_sid]['RecoilRadius'] = float(recoil_match.group(1))
+def load_weapon_stats_map(patcher):
+    """
+    Maps the SIDs of WeaponGeneralSetupPrototypes.cfg to their MaxAmmo, RecoilRadius and
+    FirstShotDispersionRadius. Values are read from the top level of each resolved struct, so
+    refkey-inherited ones are included and nested structs never leak into a weapon. The map is
+    cached for every patcher with the same registry, loaded structs and catalog.
+    """
+    parsed = patcher.get_source(WEAPON_SETUP_PATH)
+    if parsed is None:
+        print(f"DEBUG: {os.path.join(patcher.source_dump, WEAPON_SETUP_PATH)} not found.")
+        return {}
 
-        # FirstShotDispersionRadius
-        fsd_match = re.search(r'^\s*FirstShotDispersionRadius\s*=\s*([\d\.]+)', line, re.IGNORECASE)
-        if fsd_match and current_sid:
-            stats_map[current_sid]['FirstShotDispersionRadius'] = float(fsd_match.group(1))
+    catalog_db = patcher.catalog.db_path if patcher.catalog is not None else None
+    cache_key = (catalog_db, frozenset(patcher.struct_to_file.items()))
+    cache = _weapon_stats_cache.setdefault(patcher.registry, {})
+    cached = cache.get(cache_key)
+    if cached is not None:
+        for rel_path in cached[0]:
+            patcher.get_source(rel_path)  # Records the inherited files in patcher.sources, as a build would
+        return cached[1]
 
+    stats_map = {}
+    dependencies = {WEAPON_SETUP_PATH}  # Every file a resolved struct inherits from
+    for node in parsed.root.children:
+        if node.name in stats_map:
+            continue  # First definition wins, like get_struct_content
+        effective = patcher.resolve_node(WEAPON_SETUP_PATH, node, dependencies)
+        stats = {}
+        for key, cast in WEAPON_STATS.items():
+            value = effective.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stats[key] = cast(value)
+        stats_map[node.name] = stats
+        sid = effective.get("SID")
+        if isinstance(sid, str) and sid != node.name:
+            stats_map.setdefault(sid, stats)
+
+    cache[cache_key] = (sorted(dependencies), stats_map)
     return stats_map
 
 
@@ -59,8 +70,3 @@ def get_npc_base_defaults(patcher):
     return {"EnemyCouldBeVisibleMaxDistance": psg.get_value(target_data, "EnemyCouldBeVisibleMaxDistance"),
             "LoseEnemyVisibilityTime": psg.get_value(target_data, "LoseEnemyVisibilityTime"),
             "CheckEnemyTime": psg.get_value(target_data, "CheckEnemyTime")}
-
-
-def get_struct_names(content):
-    """Returns a list of top-level struct SIDs found in the content."""
-    return re.findall(r'^(\w+)\s*:\s*struct\.begin', content, re.MULTILINE)
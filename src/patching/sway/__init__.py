@@ -1,7 +1,6 @@
 import os
-import re
 import patching_script_general as psg
-from patch_config import SOURCE_DUMP, get_mod_root
+from patch_config import SOURCE_DUMP, PARSE_CACHE_DIR, get_mod_root
 
 EFFECTS = ["LessSwayX", "LessSwayY", "LessSwayTime"]
 WEAPON_NESTED_PATH = ["AimingEffects", "PlayerOnlyEffects"]
@@ -15,51 +14,22 @@ def patch_weapons(patcher):
     inheritors = patcher.get_all_inheritors('TemplateWeapon')
     
     for s in inheritors:
-        # Check if node exists in chain
-        if psg.has_nested_node(patcher.file_contents[weapon_file], s, WEAPON_NESTED_PATH):
-            patch = psg.generate_bpatch(s, WEAPON_NESTED_PATH, EFFECTS)
-            patcher.add_patch(weapon_file, patch)
-        else:
-            # Check parent content for nested node recursively
-            current = s
-            found = False
-            visited = set()
-            while current and current not in visited:
-                visited.add(current)
-                data = psg.get_struct_content(patcher.file_contents[weapon_file], current)
-                if data and psg.has_nested_node(data, current, WEAPON_NESTED_PATH):
-                    found = True
-                    break
-                current = patcher.global_tree.get(current)
-            
-            if found:
-                patch = psg.generate_bpatch(s, WEAPON_NESTED_PATH, EFFECTS)
-                patcher.add_patch(weapon_file, patch)
+        # The effective struct carries nested nodes inherited from anywhere in the refkey chain
+        effective = patcher.resolve(s)
+        if effective is not None and effective.find_path(WEAPON_NESTED_PATH):
+            patcher.add_patch(weapon_file, psg.BPatch.build(s, WEAPON_NESTED_PATH, EFFECTS))
 
 def patch_attachments(patcher):
     attach_file = 'Content/GameLite/GameData/ItemPrototypes/AttachPrototypes.cfg'
     patcher.load_files([attach_file])
     
     filename = os.path.basename(attach_file)
-    content = patcher.file_contents[filename]
-    
-    structs = re.findall(r'^\s*(\w+)\s*:\s*struct\.begin', content, re.MULTILINE)
     
-    for s in structs:
+    for s in patcher.get_top_level_structs(filename):
         # Check properties in chain
-        current = s
-        has_breath = False
-        has_scope = False
-        visited = set()
-        while current and current not in visited:
-            visited.add(current)
-            data = psg.get_struct_content(content, current)
-            if data:
-                if not has_breath and "CanHoldBreath" in data:
-                    has_breath = True
-                if not has_scope and psg.has_nested_node(data, current, ATTACH_NESTED_PATH):
-                    has_scope = True
-            current = patcher.global_tree.get(current)
+        effective = patcher.resolve(s)
+        has_breath = effective.get("CanHoldBreath", deep=True) is not None
+        has_scope = effective.find_path(ATTACH_NESTED_PATH) is not None
             
         if not (has_breath or has_scope):
             continue
@@ -68,15 +38,16 @@ def patch_attachments(patcher):
         patch_nested_path = ATTACH_NESTED_PATH if has_scope else None
         patch_values = EFFECTS if has_scope else None
         
-        patch_text = psg.generate_bpatch(s, patch_nested_path, patch_values, root_properties=patch_props)
-        patcher.add_patch(filename, patch_text)
+        patch = psg.BPatch.build(s, patch_nested_path, patch_values, root_properties=patch_props)
+        patcher.add_patch(filename, patch)
 
 def run():
     print("--- Running LessSway Patching ---")
     mod_root = get_mod_root("LessSway")
-    patcher = psg.ModPatcher(SOURCE_DUMP, mod_root)
+    patcher = psg.ModPatcher(SOURCE_DUMP, mod_root, PARSE_CACHE_DIR, lazy=True)
     
     patch_weapons(patcher)
     patch_attachments(patcher)
     
     patcher.save_all("LessSway")
+    return patcher
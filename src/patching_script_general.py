@@ -1,6 +1,13 @@
 import os
+import io
 import re
 import math
+import sys
+import array
+import pickle
+import hashlib
+import collections
+import concurrent.futures
 
 def round_to_nearest(val, nearest=0.5):
     """Rounds a value to the nearest increment (default 0.5)."""
@@ -14,13 +21,538 @@ def is_special_npc(name):
             return True
     return False
 
-def get_value(content, key, preserve_case=True):
-    """Extracts a numerical or string value from a config block."""
-    match = re.search(rf'{key}\s*=\s*([\d\.\w\-%\'\/]+)', content, re.IGNORECASE)
-    if not match:
+_STRUCT_BEGIN_RE = re.compile(r'^(\S+?)\s*:\s*struct\.begin\b\s*(?:\{([^}]*)\})?\s*(struct\.end\b)?', re.IGNORECASE)
+_STRUCT_END_RE = re.compile(r'^struct\.end\b', re.IGNORECASE)
+_PROPERTY_RE = re.compile(r'^(\S+?)\s*=\s*(.*?)\s*$')
+_SID_RE = re.compile(r'\w+')
+_INT_RE = re.compile(r'[-+]?\d+')
+_FLOAT_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?f?', re.IGNORECASE)
+_ENUM_RE = re.compile(r'\w+::\w+')
+
+class EnumRef(str):
+    """An enum reference value such as `EDamageBone::Head`."""
+
+    @property
+    def enum_type(self):
+        return self.split('::', 1)[0]
+
+    @property
+    def member(self):
+        return self.split('::', 1)[1]
+
+def parse_value(raw):
+    """Types a raw property value: bool, int, float (with `f` suffix), percentage (as a fraction), EnumRef or str."""
+    lowered = raw.lower()
+    if lowered == 'true':
+        return True
+    if lowered == 'false':
+        return False
+    if raw.endswith('%') and _FLOAT_RE.fullmatch(raw[:-1]):
+        return float(raw[:-1].rstrip('fF')) / 100.0
+    if _INT_RE.fullmatch(raw):
+        return int(raw)
+    if _FLOAT_RE.fullmatch(raw):
+        return float(raw.rstrip('fF'))
+    if _ENUM_RE.fullmatch(raw):
+        return EnumRef(raw)
+    return raw
+
+def _strip_comment(line):
+    """Removes a trailing // comment that is not inside a quoted value."""
+    if '//' not in line:
+        return line
+    quote = None
+    for i, ch in enumerate(line):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ('"', "'"):
+            quote = ch
+        elif line.startswith('//', i):
+            return line[:i]
+    return line
+
+def parse_modifiers(text):
+    """Parses the `{bpatch}` / `{refurl=...; refkey=...}` suffix of a struct header into a dict."""
+    modifiers = {}
+    if not text:
+        return modifiers
+    for part in text.split(';'):
+        part = part.strip()
+        if not part:
+            continue
+        if '=' in part:
+            k, v = part.split('=', 1)
+            modifiers[sys.intern(k.strip().lower())] = sys.intern(v.strip())
+        else:
+            modifiers[sys.intern(part.lower())] = True
+    return modifiers
+
+_NO_MODIFIERS = {} # shared by every struct header without a {...} suffix; never mutated
+
+# Kind codes for StructTable.kinds; the numeric value itself lives in StructTable.nums
+_KIND_OTHER, _KIND_BOOL, _KIND_INT, _KIND_FLOAT = range(4)
+_MAX_EXACT_INT = 2 ** 53 # larger ints do not survive a round trip through a double
+_INTERN_MAX_LEN = 64 # short raw values repeat a lot across the dump; long ones rarely do
+
+def _typed_entry(key, raw):
+    """Builds the (key, raw, kind, number) row StructTable stores for one property."""
+    value = parse_value(raw)
+    if len(raw) <= _INTERN_MAX_LEN:
+        raw = sys.intern(raw)
+    if isinstance(value, bool):
+        return sys.intern(key), raw, _KIND_BOOL, float(value)
+    if isinstance(value, int) and abs(value) <= _MAX_EXACT_INT:
+        return sys.intern(key), raw, _KIND_INT, float(value)
+    if isinstance(value, float):
+        return sys.intern(key), raw, _KIND_FLOAT, value
+    return sys.intern(key), raw, _KIND_OTHER, 0.0
+
+class StructTable:
+    """
+    Flat storage shared by every CfgStruct of one parse. Property keys, raw values, kind codes
+    and numbers sit in parallel arrays, array items and child references in two more lists,
+    and each node only keeps the offsets of its own slices.
+    """
+    __slots__ = ('keys', 'raw', 'kinds', 'nums', 'items', 'nodes')
+
+    def __init__(self):
+        self.keys = [] # interned property keys
+        self.raw = [] # raw property values, short ones interned
+        self.kinds = array.array('b') # _KIND_* per property
+        self.nums = array.array('d') # numeric value per property (0.0 unless bool/int/float)
+        self.items = [] # raw values of `[*] = ...` / `[n] = ...` array entries
+        self.nodes = [] # nested CfgStruct, including `[*] : struct.begin` items
+
+    def __getstate__(self):
+        return self.keys, self.raw, self.kinds, self.nums, self.items, self.nodes
+
+    def __setstate__(self, state):
+        self.keys, self.raw, self.kinds, self.nums, self.items, self.nodes = state
+
+    def add(self, node, entries, items, children):
+        """Appends a finished node's (key, raw, kind, number) entries, items and children and points the node at them."""
+        node._table = self
+        node._p0 = len(self.keys)
+        for key, raw, kind, num in entries:
+            self.keys.append(key)
+            self.raw.append(raw)
+            self.kinds.append(kind)
+            self.nums.append(num)
+        node._p1 = len(self.keys)
+        node._i0 = len(self.items)
+        self.items.extend(items)
+        node._i1 = len(self.items)
+        node._c0 = len(self.nodes)
+        self.nodes.extend(children)
+        node._c1 = len(self.nodes)
+
+    def value(self, i):
+        """Typed value of property row i, the same thing parse_value returns for its raw text."""
+        kind = self.kinds[i]
+        if kind == _KIND_FLOAT:
+            return self.nums[i]
+        if kind == _KIND_INT:
+            return int(self.nums[i])
+        if kind == _KIND_BOOL:
+            return self.nums[i] != 0.0
+        return parse_value(self.raw[i])
+
+_EMPTY_TABLE = StructTable()
+
+class CfgStruct:
+    """A parsed `name : struct.begin ... struct.end` block."""
+    __slots__ = ('name', 'modifiers', 'start', 'end', 'parent', '_source', '_table', '_p0', '_p1', '_i0', '_i1',
+                 '_c0', '_c1', '_struct_index', '_value_index', '_path_index', '_child_index', '_values')
+    _STATE = ('name', 'modifiers', 'start', 'end', 'parent', '_source', '_table', '_p0', '_p1', '_i0', '_i1',
+              '_c0', '_c1')
+
+    def __init__(self, name, modifiers=None, start=0, parent=None):
+        self.name = name
+        self.modifiers = modifiers if modifiers else _NO_MODIFIERS
+        self.start = start
+        self.end = start
+        self.parent = parent # enclosing struct; the root's top-level structs point at the root
+        self._source = None # file text while the body is still unparsed (see scan_cfg)
+        self._table = _EMPTY_TABLE
+        self._p0 = self._p1 = self._i0 = self._i1 = self._c0 = self._c1 = 0
+        self._reset_indexes()
+
+    def _reset_indexes(self):
+        # Lookup indexes are built lazily on first use and never pickled
+        self._struct_index = None
+        self._value_index = None
+        self._path_index = None
+        self._child_index = None
+        self._values = None
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self._STATE)
+
+    def _loaded(self):
+        """Returns the node's table, parsing the body first if scan_cfg left it unparsed."""
+        if self._source is not None:
+            source, self._source = self._source, None
+            parsed = parse_cfg(source[self.start:self.end], self.start).children[0]
+            self._table = parsed._table
+            self._p0, self._p1, self._i0, self._i1 = parsed._p0, parsed._p1, parsed._i0, parsed._i1
+            self._c0, self._c1 = parsed._c0, parsed._c1
+            for child in self.children:
+                child.parent = self
+        return self._table
+
+    def __setstate__(self, state):
+        for slot, value in zip(self._STATE, state):
+            setattr(self, slot, value)
+        self._reset_indexes()
+
+    @property
+    def path(self):
+        """Names from the top-level struct down, e.g. SID/AIParameters/BehaviorTypes/Master/Long."""
+        names = []
+        node = self
+        while node is not None and node.name is not None:
+            names.append(node.name)
+            node = node.parent
+        return "/".join(reversed(names))
+
+    @property
+    def properties(self):
+        """(key, raw value) pairs in file order."""
+        table = self._loaded()
+        return list(zip(table.keys[self._p0:self._p1], table.raw[self._p0:self._p1]))
+
+    @property
+    def items(self):
+        return self._loaded().items[self._i0:self._i1]
+
+    @property
+    def children(self):
+        return self._loaded().nodes[self._c0:self._c1]
+
+    def entries(self):
+        """Yields the stored (key, raw, kind, number) rows of this struct's properties."""
+        table = self._loaded()
+        for i in range(self._p0, self._p1):
+            yield table.keys[i], table.raw[i], table.kinds[i], table.nums[i]
+
+    def numbers(self):
+        """Yields (key, float) for the bool, int, float and percentage properties, without re-parsing them."""
+        table = self._loaded()
+        kinds, nums = table.kinds, table.nums
+        for i in range(self._p0, self._p1):
+            if kinds[i] != _KIND_OTHER:
+                yield table.keys[i], nums[i]
+
+    @property
+    def values(self):
+        """Direct properties of this struct, keyed by lowercased name, with typed values."""
+        if self._values is None:
+            table = self._loaded()
+            values = {}
+            for i in range(self._p0, self._p1):
+                key = table.keys[i].lower()
+                if key not in values:
+                    values[key] = table.value(i)
+            self._values = values
+        return self._values
+
+    def get(self, key, default=None, deep=False):
+        """Returns the typed value of `key`; with deep=True nested structs are searched too."""
+        if deep:
+            raw = self.find_value(key)
+            return parse_value(raw) if raw is not None else default
+        return self.values.get(key.lower(), default)
+
+    @property
+    def refkey(self):
+        return self.modifiers.get('refkey')
+
+    @property
+    def refurl(self):
+        return self.modifiers.get('refurl')
+
+    def walk(self):
+        """Yields this struct and all nested structs in document order."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def walk_paths(self):
+        """Like walk(), but yields (path, node) without rebuilding each path from the parent chain."""
+        stack = [(self.path, self)]
+        while stack:
+            path, node = stack.pop()
+            yield path, node
+            prefix = f"{path}/" if path else ""
+            stack.extend((prefix + child.name, child) for child in reversed(node.children))
+
+    def find(self, name):
+        """Returns the first struct called `name` (case-insensitive), searching this struct and its descendants."""
+        if self._struct_index is None:
+            index = {}
+            for node in self.walk():
+                if node.name is not None:
+                    index.setdefault(node.name.lower(), node)
+            self._struct_index = index
+        return self._struct_index.get(name.lower())
+
+    def child(self, name):
+        """Returns the first direct child called `name` (case-insensitive)."""
+        if self._child_index is None:
+            index = {}
+            for node in self.children:
+                index.setdefault(node.name.lower(), node)
+            self._child_index = index
+        return self._child_index.get(name.lower())
+
+    def find_path(self, names):
+        """Follows a sequence of find() lookups, e.g. ["Scope", "AimingEffects"]; returns None if any step is missing."""
+        current = self
+        for name in names:
+            current = current.find(name)
+            if current is None:
+                return None
+        return current
+
+    def get_path(self, path):
+        """
+        Returns the struct at an exact `A/B/C` path below this one (first match in document order
+        when names repeat). Only the structs along the path are visited, so unparsed bodies of
+        unrelated structs stay unparsed.
+        """
+        return self._get_path(path.split('/'))
+
+    def _get_path(self, names):
+        if self._path_index is None:
+            index = {}
+            for node in self.children:
+                index.setdefault(node.name, []).append(node)
+            self._path_index = index
+        for node in self._path_index.get(names[0], ()):
+            found = node._get_path(names[1:]) if len(names) > 1 else node
+            if found is not None:
+                return found
         return None
-    val_str = match.group(1)
-    
+
+    def find_value(self, key):
+        """Returns the raw value of `key`, preferring direct properties over nested ones."""
+        if self._value_index is None:
+            index = {}
+            for node in self.walk():
+                table = node._loaded()
+                for i in range(node._p0, node._p1):
+                    index.setdefault(table.keys[i].lower(), table.raw[i])
+            self._value_index = index
+        return self._value_index.get(key.lower())
+
+CfgEvent = collections.namedtuple('CfgEvent', 'kind name value depth start end')
+CfgEvent.__doc__ = """
+One streaming parse event. kind is 'struct_begin' (value = modifiers dict), 'property',
+'array_item' (name = `[*]`/`[n]`, value = raw text), 'struct_end' (value = False when the
+struct was closed by end of file) or 'stray_end' for a struct.end with nothing open.
+depth counts the structs enclosing the event; start/end are character offsets in the text.
+"""
+
+def iter_cfg_events(lines):
+    """
+    Streams parse events from a file handle (or any iterable of lines) without holding the
+    whole file: memory stays bounded by the nesting depth, not the file size.
+    """
+    stack = [] # names of open structs
+    offset = 0
+    for line in lines:
+        line_start = offset
+        offset += len(line)
+        stripped = _strip_comment(line).strip()
+        if not stripped:
+            continue
+
+        if _STRUCT_END_RE.match(stripped):
+            end = line_start + line.lower().index('struct.end') + len('struct.end')
+            if stack:
+                yield CfgEvent('struct_end', stack.pop(), True, len(stack), line_start, end)
+            else:
+                yield CfgEvent('stray_end', None, None, 0, line_start, end)
+            continue
+
+        match = _STRUCT_BEGIN_RE.match(stripped)
+        if match:
+            name = match.group(1)
+            yield CfgEvent('struct_begin', name, parse_modifiers(match.group(2)), len(stack), line_start, None)
+            if match.group(3):
+                end = line_start + line.lower().rindex('struct.end') + len('struct.end')
+                yield CfgEvent('struct_end', name, True, len(stack), line_start, end)
+            else:
+                stack.append(name)
+            continue
+
+        match = _PROPERTY_RE.match(stripped)
+        if match:
+            key, value = match.groups()
+            kind = 'array_item' if key.startswith('[') else 'property'
+            yield CfgEvent(kind, key, value, len(stack), line_start, offset)
+
+    while stack:
+        yield CfgEvent('struct_end', stack.pop(), False, len(stack), offset, offset)
+
+def parse_cfg(text, offset=0):
+    """
+    Parses .cfg text in a single pass into a root CfgStruct whose children are the top-level structs.
+    offset is added to every start/end, for text that was sliced out of a larger file.
+    """
+    table = StructTable()
+    root = CfgStruct(None, start=offset)
+    stack = [(root, [], [], [])] # (node, property entries, items, children) of each open struct
+    for event in iter_cfg_events(io.StringIO(text)):
+        kind = event.kind
+        if kind == 'property':
+            stack[-1][1].append(_typed_entry(event.name, event.value))
+        elif kind == 'struct_begin':
+            node = CfgStruct(sys.intern(event.name), event.value, event.start + offset, stack[-1][0])
+            stack[-1][3].append(node)
+            stack.append((node, [], [], []))
+        elif kind == 'struct_end':
+            # A struct's rows are appended when it closes, so each node's slices stay contiguous
+            node, entries, items, children = stack.pop()
+            node.end = event.end + offset
+            table.add(node, entries, items, children)
+        elif kind == 'array_item':
+            stack[-1][2].append(event.value)
+    root.end = offset + len(text)
+    table.add(*stack[0])
+    return root
+
+def iter_top_level_structs(lines):
+    """
+    Streams the top-level structs of a file one at a time, each parsed with parse_cfg from its own
+    lines: memory stays bounded by the largest struct, not the file size. Repeated names are all yielded.
+    """
+    buffer = [] # lines read since the current top-level struct began
+    start = 0
+    def tee():
+        for line in lines:
+            buffer.append(line)
+            yield line
+    for event in iter_cfg_events(tee()):
+        if event.depth:
+            continue
+        if event.kind == 'struct_begin':
+            del buffer[:-1]
+            start = event.start
+        elif event.kind == 'struct_end':
+            yield parse_cfg("".join(buffer), start).children[0]
+            buffer.clear()
+
+_STRUCT_LINE_RE = re.compile(r'^.*struct\.(?:begin|end)\b.*$', re.MULTILINE | re.IGNORECASE)
+
+def scan_cfg(text):
+    """
+    Lazy counterpart of parse_cfg: only struct.begin/struct.end lines are looked at, and only the
+    top-level structs (name, header modifiers, offsets) are recorded. Each keeps a reference to
+    the file text and parses its own body the first time its properties or children are read.
+    Properties outside any struct are not recorded.
+    """
+    root = CfgStruct(None)
+    top_level = []
+    depth = 0
+    for match in _STRUCT_LINE_RE.finditer(text):
+        line = match.group()
+        stripped = _strip_comment(line).strip()
+        if _STRUCT_END_RE.match(stripped):
+            if depth:
+                depth -= 1
+                if not depth:
+                    top_level[-1].end = match.start() + line.lower().index('struct.end') + len('struct.end')
+            continue
+
+        begin = _STRUCT_BEGIN_RE.match(stripped)
+        if not begin:
+            continue
+        if not depth:
+            node = CfgStruct(sys.intern(begin.group(1)), parse_modifiers(begin.group(2)), match.start(), root)
+            node._source = text
+            top_level.append(node)
+            if begin.group(3):
+                node.end = match.start() + line.lower().rindex('struct.end') + len('struct.end')
+                continue
+        if not begin.group(3):
+            depth += 1
+    if depth:
+        top_level[-1].end = len(text)
+    root.end = len(text)
+    StructTable().add(root, (), (), top_level)
+    return root
+
+def merge_structs(base, override):
+    """
+    Returns the effective struct of `override` inheriting from `base`: properties are overridden
+    key by key, named nested structs are merged recursively, and array entries ([*]/[n]) defined
+    by `override` replace the inherited ones. Subtrees `override` does not touch are shared with `base`.
+    """
+    merged = CfgStruct(override.name, override.modifiers, override.start, override.parent)
+    merged.end = override.end
+
+    own = {entry[0].lower(): entry for entry in override.entries()}
+    entries = [own.pop(entry[0].lower(), entry) for entry in base.entries()]
+    entries.extend(own.values())
+    items = override.items or base.items
+
+    children = []
+    override_children = override.children
+    override_has_array = any(c.name.startswith('[') for c in override_children)
+    for node in base.children:
+        if node.name.startswith('['):
+            if not override_has_array:
+                children.append(node)
+            continue
+        replacement = override.child(node.name)
+        children.append(merge_structs(node, replacement) if replacement else node)
+    for node in override_children:
+        if node.name.startswith('[') or base.child(node.name) is None:
+            children.append(node)
+
+    StructTable().add(merged, entries, items, children)
+    return merged
+
+def build_span_index(root):
+    """Maps every struct path in a parsed file to its (start, end) offsets in the file text."""
+    spans = {}
+    for path, node in root.walk_paths():
+        if path:
+            spans.setdefault(path, (node.start, node.end))
+    return spans
+
+def build_inheritance_tree(root):
+    """Builds a child -> parent mapping from the top-level structs of a parsed file."""
+    tree = {}
+    for node in root.children:
+        if not _SID_RE.fullmatch(node.name):
+            continue
+        parent = node.refkey
+        tree[node.name] = parent if isinstance(parent, str) and _SID_RE.fullmatch(parent) else None
+    return tree
+
+class StructText(str):
+    """
+    Raw text of a struct (or a whole file) that remembers its parsed node.
+    Behaves like the plain string callers always got, but lets get_struct_content,
+    get_value and has_nested_node answer from the tree instead of rescanning text.
+    """
+
+    @classmethod
+    def wrap(cls, source, node, root=None, span=None):
+        start, end = span if span is not None else (node.start, node.end)
+        text = cls(source[start:end])
+        text.source = source
+        text.node = node
+        text.root = root if root is not None else node
+        return text
+
+def _coerce_value(val_str, preserve_case=True):
+    """Converts a raw value token into a float/int where possible."""
     # Handle percentages
     if '%' in val_str:
         try:
@@ -37,44 +569,93 @@ def get_value(content, key, preserve_case=True):
     except ValueError:
         return val_str if preserve_case else val_str.lower()
 
+def get_value(content, key, preserve_case=True, deep=False):
+    """
+    Extracts a numerical or string value from a config block.
+    Parsed content answers from the struct's own typed property table; pass deep=True
+    to also look inside nested structs. Plain strings fall back to a regex search.
+    """
+    node = getattr(content, 'node', None)
+    if node is not None:
+        val = node.get(key, deep=deep)
+        if isinstance(val, str) and not preserve_case:
+            return val.lower()
+        return val
+
+    match = re.search(rf'{key}\s*=\s*([\d\.\w\-%\'\/]+)', content, re.IGNORECASE)
+    if not match:
+        return None
+    return _coerce_value(match.group(1), preserve_case)
+
 def get_inheritance_tree(file_path):
-    """Builds a child -> parent mapping from a .cfg file."""
+    """Builds a child -> parent mapping from a .cfg file, streaming it rather than loading it."""
     tree = {}
-    # Matches struct name and captures the refkey value if present within braces
-    pattern = re.compile(r'^\s*(\w+)\s*:\s*struct\.begin(?:\s*\{.*refkey\s*=\s*(\w+).*\})?', re.MULTILINE | re.IGNORECASE)
-    
     with open(file_path, 'r', encoding='utf-8-sig') as f:
-        content = f.read()
-        for match in pattern.finditer(content):
-            struct_name = match.group(1)
-            parent_name = match.group(2)
-            tree[struct_name] = parent_name
+        for event in iter_cfg_events(f):
+            if event.kind != 'struct_begin' or event.depth != 0 or not _SID_RE.fullmatch(event.name):
+                continue
+            parent = event.value.get('refkey')
+            tree[event.name] = parent if isinstance(parent, str) and _SID_RE.fullmatch(parent) else None
     return tree
 
-def find_all_inheritors(tree, base_struct):
-    """Recursively finds all structs that inherit from base_struct."""
-    inheritors = set()
-    memo = {}
-
-    def inherits_from(struct, target):
-        if struct in memo: return memo[struct]
-        if struct == target: return True
-        parent = tree.get(struct)
-        if not parent:
-            res = False
-        else:
-            res = inherits_from(parent, target)
-        memo[struct] = res
-        return res
+def build_children_index(tree):
+    """Inverts a child -> parent mapping into parent -> [children]."""
+    children = {}
+    for struct, parent in tree.items():
+        if parent:
+            children.setdefault(parent, []).append(struct)
+    return children
 
-    for struct in tree:
-        if struct != base_struct and inherits_from(struct, base_struct):
-            inheritors.add(struct)
-            
+def find_all_inheritors(tree, base_struct, children_index=None):
+    """Finds all structs that inherit from base_struct, walking down from it (cycle-safe)."""
+    if children_index is None:
+        children_index = build_children_index(tree)
+    inheritors = set()
+    stack = [base_struct]
+    while stack:
+        for child in children_index.get(stack.pop(), ()):
+            if child not in inheritors and child != base_struct:
+                inheritors.add(child)
+                stack.append(child)
     return inheritors
 
+def find_refkey_cycles(tree):
+    """Returns every refkey loop in a child -> parent mapping as a list of SIDs, in linear time."""
+    cycles = []
+    state = {} # struct -> id of the walk that first reached it
+    for walk_id, start in enumerate(tree):
+        current = start
+        while current is not None and current not in state:
+            state[current] = walk_id
+            current = tree.get(current)
+        if current is not None and state[current] == walk_id:
+            # The walk ran into itself: everything from `current` onwards is a loop
+            cycle = [current]
+            parent = tree.get(current)
+            while parent != current:
+                cycle.append(parent)
+                parent = tree.get(parent)
+            cycles.append(cycle)
+    return cycles
+
+def _find_struct(node, struct_name):
+    """
+    Finds `struct_name` below a parsed node for the text helpers: direct children first, then a
+    search of the node's subtree. A whole file is only searched at the top level, so one lookup
+    never parses every lazily scanned struct of the file.
+    """
+    found = node.child(struct_name)
+    if found is None and node.parent is not None:
+        found = node.find(struct_name)
+    return found
+
 def get_struct_content(file_content, struct_name):
     """Returns the full string content of a struct definition, handling indentation."""
+    node = getattr(file_content, 'node', None)
+    if node is not None:
+        found = _find_struct(node, struct_name)
+        return StructText.wrap(file_content.source, found, file_content.root) if found else None
+
     pattern = re.compile(rf'^\s*{struct_name}\s*:\s*struct\.begin', re.MULTILINE | re.IGNORECASE)
     match = pattern.search(file_content)
     if not match:
@@ -98,6 +679,15 @@ def get_struct_content(file_content, struct_name):
 
 def has_nested_node(file_content, struct_name, node_path):
     """Checks if a struct contains a nested node path."""
+    node = getattr(file_content, 'node', None)
+    if node is not None:
+        current = _find_struct(node, struct_name)
+        for name in node_path:
+            if current is None:
+                return False
+            current = current.find(name)
+        return current is not None
+
     current_content = get_struct_content(file_content, struct_name)
     if not current_content:
         return False
@@ -124,97 +714,812 @@ def has_nested_node(file_content, struct_name, node_path):
         
     return True
 
+class BPatch:
+    """
+    A patch block under construction: `name : struct.begin {bpatch}` with properties, `[*]`
+    array entries, nested blocks and removenode markers, kept in insertion order. Patches can
+    be inspected and compared as objects and are serialized in one pass by write().
+    """
+    INDENT = "   "
+
+    def __init__(self, name, bpatch=True):
+        self.name = name
+        self.bpatch = bpatch # False writes a plain `struct.begin`, e.g. for new [*] array structs
+        self.entries = [] # (kind, name, value): 'property', 'item', 'struct', 'removenode' or 'raw'
+        self._properties = {} # lowercased key -> index in entries
+        self._structs = {} # name -> nested BPatch
+
+    @classmethod
+    def build(cls, struct_name, nested_path=None, values=None, direct_properties=None, root_properties=None):
+        """
+        Builds the block generate_bpatch describes: root_properties on the struct itself, then
+        direct_properties and array values at the end of nested_path. A path entry that already
+        reads `X : struct.begin` opens X without {bpatch} unless it says so; a value that already starts with `[*]`
+        is written verbatim.
+        """
+        patch = cls(struct_name)
+        for k, v in (root_properties or {}).items():
+            patch.set(k, v)
+
+        node = patch
+        for name in nested_path or []:
+            if "struct.begin" in name:
+                node = node.node(name.split(':', 1)[0].strip(), bpatch="{bpatch}" in name)
+            else:
+                node = node.node(name)
+
+        for k, v in (direct_properties or {}).items():
+            node.set(k, v)
+        for val in values or []:
+            if val.strip().startswith("[*]"):
+                node.entries.append(('raw', None, val.strip()))
+            else:
+                node.add_item(val)
+        return patch
+
+    def set(self, key, value):
+        """Assigns a property. Assigning a key again replaces its value in place."""
+        value = format_cfg_value(value)
+        index = self._properties.get(key.lower())
+        if index is None:
+            self._properties[key.lower()] = len(self.entries)
+            self.entries.append(('property', key, value))
+        else:
+            self.entries[index] = ('property', self.entries[index][1], value)
+
+    def get(self, key, default=None):
+        """Returns the serialized value of a property set on this block."""
+        index = self._properties.get(key.lower())
+        return self.entries[index][2] if index is not None else default
+
+    def add_item(self, value):
+        """Appends a `[*] = value` array entry."""
+        self.entries.append(('item', '[*]', format_cfg_value(value)))
+
+    def add_struct_item(self):
+        """Appends a `[*] : struct.begin` array entry and returns it for filling."""
+        item = BPatch('[*]', bpatch=False)
+        self.entries.append(('struct', item.name, item))
+        return item
+
+    def add(self, child):
+        """Appends an already built BPatch as a nested block and returns it."""
+        self.entries.append(('struct', child.name, child))
+        self._structs.setdefault(child.name, child)
+        return child
+
+    def node(self, name, bpatch=True):
+        """Returns the nested block called name, creating it on first use."""
+        child = self._structs.get(name)
+        return child if child is not None else self.add(BPatch(name, bpatch))
+
+    def remove_node(self, name):
+        """Appends a `name : removenode` entry; a later node(name) starts a new block."""
+        self.entries.append(('removenode', name, None))
+        self._structs.pop(name, None)
+
+    def merge(self, other, conflicts=None, path=None):
+        """
+        Folds another block for the same struct into this one, as if the game applied both in
+        order: later property values win, array items and removenode entries are appended, nested
+        {bpatch} blocks merge by name and a nested plain struct.begin (a full replacement)
+        replaces what was there. Properties assigned two different values are recorded in
+        conflicts as (path, key, old value, new value). other is copied, never shared.
+        """
+        path = path or self.name
+        for kind, name, value in other.entries:
+            if kind == 'property':
+                old = self.get(name)
+                if old is not None and old != value and conflicts is not None:
+                    conflicts.append((path, name, old, value))
+                self.set(name, value)
+            elif kind == 'struct':
+                self._merge_struct(value, conflicts, f"{path}/{name}")
+            elif kind == 'removenode':
+                self.remove_node(name)
+            else:
+                self.entries.append((kind, name, value))
+
+    def _merge_struct(self, child, conflicts, path):
+        if child.name == '[*]':
+            self.add_struct_item().merge(child, conflicts, path)
+            return
+        existing = self._structs.get(child.name)
+        if existing is not None and child.bpatch:
+            existing.merge(child, conflicts, path)
+            return
+
+        target = BPatch(child.name, child.bpatch)
+        if existing is None:
+            self.add(target)
+        else:
+            index = next(i for i, entry in enumerate(self.entries) if entry[2] is existing)
+            self.entries[index] = ('struct', child.name, target)
+            self._structs[child.name] = target
+        target.merge(child, conflicts, path)
+
+    @property
+    def properties(self):
+        return [(name, value) for kind, name, value in self.entries if kind == 'property']
+
+    @property
+    def children(self):
+        return [value for kind, _, value in self.entries if kind == 'struct']
+
+    def is_empty(self):
+        return not self.entries
+
+    def assignments(self, path=()):
+        """Yields (path, key) for every property this block sets, path being the nested block names."""
+        for kind, name, value in self.entries:
+            if kind == 'property':
+                yield path, name
+            elif kind == 'struct':
+                yield from value.assignments(path + (name,))
+
+    def prune(self, keep, path=()):
+        """
+        Drops properties for which keep(path, key, value) is False, looking only inside {bpatch}
+        blocks (a plain struct.begin replaces the whole struct, so every line of it matters), then
+        drops nested blocks left empty. Returns the number of properties and blocks removed.
+        """
+        removed = 0
+        entries = []
+        for entry in self.entries:
+            kind, name, value = entry
+            if kind == 'property' and self.bpatch and not keep(path, name, value):
+                removed += 1
+                continue
+            if kind == 'struct' and value.bpatch:
+                removed += value.prune(keep, path + (name,))
+                if value.is_empty():
+                    removed += 1
+                    continue
+            entries.append(entry)
+
+        if removed:
+            self.entries = entries
+            self._properties = {name.lower(): i for i, (kind, name, _) in enumerate(entries) if kind == 'property'}
+            self._structs = {}
+            for kind, name, value in entries:
+                if kind == 'struct':
+                    self._structs.setdefault(name, value)
+                elif kind == 'removenode':
+                    self._structs.pop(name, None)
+        return removed
+
+    def write(self, out, depth=0):
+        """Writes the block to a file-like object, without a trailing newline."""
+        indent = self.INDENT * depth
+        inner = indent + self.INDENT
+        out.write(f"{indent}{self.name} : struct.begin {{bpatch}}" if self.bpatch
+                  else f"{indent}{self.name} : struct.begin")
+        for kind, name, value in self.entries:
+            out.write("\n")
+            if kind == 'property' or kind == 'item':
+                out.write(f"{inner}{name} = {value}")
+            elif kind == 'struct':
+                value.write(out, depth + 1)
+            elif kind == 'removenode':
+                out.write(f"{inner}{name} : removenode")
+            else:
+                out.write(f"{inner}{value}")
+        out.write(f"\n{indent}struct.end")
+
+    def render(self):
+        out = io.StringIO()
+        self.write(out)
+        return out.getvalue()
+
+    def __str__(self):
+        return self.render()
+
+def coalesce_patches(patches):
+    """
+    Merges BPatch blocks aimed at the same top-level struct into one block at the position of
+    the first, so each SID (and each nested path under it) is patched once per file. Patches
+    added as text are kept as they are. Returns (patches, conflicts); see BPatch.merge.
+    """
+    merged = BPatch(None)
+    conflicts = []
+    for patch in patches:
+        if isinstance(patch, BPatch):
+            merged._merge_struct(patch, conflicts, patch.name)
+        else:
+            merged.entries.append(('raw', None, patch))
+    return [value for _, _, value in merged.entries], conflicts
+
+def same_cfg_value(raw, value):
+    """True if a raw patch value means the same as a typed value: `5`, `5.0` and `5.0000f` all match 5."""
+    parsed = parse_value(raw)
+    if isinstance(parsed, bool) or isinstance(value, bool):
+        return parsed is value
+    return parsed == value
+
+def render_patches(patches):
+    """Serializes a file's patches (BPatch or text) into one string, blank-line separated."""
+    out = io.StringIO()
+    for i, patch in enumerate(patches):
+        if i:
+            out.write("\n\n")
+        if isinstance(patch, BPatch):
+            patch.write(out)
+        else:
+            out.write(patch)
+    return out.getvalue()
+
+def write_file_if_changed(path, text):
+    """
+    Writes text (UTF-8, platform newlines as text mode would) only if the file does not already
+    hold exactly those bytes, through a temp file and rename so a crash never leaves a partial
+    file. Returns True if the file was written.
+    """
+    data = text.replace("\n", os.linesep).encode('utf-8')
+    if os.path.exists(path) and os.path.getsize(path) == len(data):
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+def format_cfg_value(value):
+    """Formats a Python value the way .cfg files spell it; strings pass through unchanged."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
 def generate_bpatch(struct_name, nested_path=None, values=None, direct_properties=None, root_properties=None):
     """
     Generates a {bpatch} block.
     If nested_path is provided, direct_properties and values apply at the end of that path.
     root_properties always apply at the first level of the struct.
     """
-    lines = [f"{struct_name} : struct.begin {{bpatch}}"]
-    
-    # Add root properties first
-    if root_properties:
-        for k, v in root_properties.items():
-            lines.append(f"   {k} = {v}")
+    return BPatch.build(struct_name, nested_path, values, direct_properties, root_properties).render()
 
-    indent = "   "
-    
-    # Traverse nested path
-    if nested_path:
-        for node in nested_path:
-            # Check if node already has {bpatch} or struct.begin in it, otherwise add it
-            if "struct.begin" not in node:
-                lines.append(f"{indent}{node} : struct.begin {{bpatch}}")
-            else:
-                lines.append(f"{indent}{node}")
-            indent += "   "
+# Bump whenever parse_cfg, scan_cfg or CfgStruct change shape so stale cache entries are ignored
+PARSE_CACHE_VERSION = 5
 
-    # Add properties at current (possibly nested) indentation
-    if direct_properties:
-        for k, v in direct_properties.items():
-            lines.append(f"{indent}{k} = {v}")
+class ParsedFile:
+    """Everything ModPatcher derives from one source file: text, struct tree, inheritance map and span index."""
 
-    # Add array elements at current indentation
-    if values:
-        for val in values:
-            if val.strip().startswith("[*]"):
-                lines.append(f"{indent}{val.strip()}")
-            else:
-                lines.append(f"{indent}[*] = {val}")
-    
-    # Close nested blocks
-    if nested_path:
-        for i in range(len(nested_path), 0, -1):
-            close_indent = "   " * i
-            lines.append(f"{close_indent}struct.end")
-        
-    lines.append("struct.end")
-    return "\n".join(lines)
+    def __init__(self, content, root, tree, spans, fingerprint=None):
+        # The content doubles as the file's StructText, so every patcher shares it without a copy
+        if not isinstance(content, StructText):
+            content = StructText(content)
+        content.source = content
+        content.node = content.root = root
+        self.content = content
+        self.root = root
+        self.tree = tree
+        self.spans = spans
+        self.fingerprint = fingerprint # (size, mtime_ns, sha1 of the raw bytes)
+
+def _read_source(abs_path):
+    """Reads a dump file the same way text mode would, returning (content, fingerprint)."""
+    st = os.stat(abs_path)
+    with open(abs_path, 'rb') as f:
+        raw = f.read()
+    content = StructText(raw.decode('utf-8-sig').replace('\r\n', '\n').replace('\r', '\n'))
+    return content, (st.st_size, st.st_mtime_ns, hashlib.sha1(raw).hexdigest())
+
+def _cache_entry_path(cache_dir, abs_path, lazy=False):
+    key = hashlib.sha1(os.path.abspath(abs_path).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"{key}.scan.pickle" if lazy else f"{key}.pickle")
+
+def _parse_source(content):
+    """Parses file text into (root, inheritance tree, span index); runs in worker processes too."""
+    root = parse_cfg(content)
+    return root, build_inheritance_tree(root), build_span_index(root)
+
+def _scan_source(content):
+    """Lazy _parse_source: top-level structs only, with spans for their own paths."""
+    root = scan_cfg(content)
+    spans = {}
+    for node in root.children:
+        spans.setdefault(node.name, (node.start, node.end))
+    return root, build_inheritance_tree(root), spans
+
+def _rebuild_scan(content, structs):
+    """Rebuilds a scan_cfg root from its cached (name, modifiers, start, end) rows over the file text."""
+    root = CfgStruct(None)
+    top_level = []
+    for name, modifiers, start, end in structs:
+        node = CfgStruct(sys.intern(name), modifiers, start, root)
+        node.end = end
+        node._source = content
+        top_level.append(node)
+    root.end = len(content)
+    StructTable().add(root, (), (), top_level)
+    return root
+
+def _read_cache_entry(entry_path, abs_path, fingerprint, content=None):
+    """
+    Returns the cached (root, tree, spans) if the entry matches the file's fingerprint. Scan
+    entries (see _write_cache_entry) are rebuilt over `content`.
+    """
+    if not entry_path or not os.path.exists(entry_path):
+        return None
+    try:
+        with open(entry_path, 'rb') as f:
+            entry = pickle.load(f)
+        if (entry.get('version') == PARSE_CACHE_VERSION and entry.get('path') == os.path.abspath(abs_path)
+                and entry.get('fingerprint') == fingerprint):
+            if 'structs' in entry:
+                return _rebuild_scan(content, entry['structs']), entry['tree'], entry['spans']
+            return entry['root'], entry['tree'], entry['spans']
+    except Exception as e: # Any entry from another code layout (moved classes, new slots) is just a miss
+        print(f"Warning: ignoring unreadable parse cache entry {entry_path}: {e}")
+    return None
+
+def _write_cache_entry(entry_path, abs_path, parsed, lazy=False):
+    """Stores a parse; a lazy scan is stored as its top-level rows only, since its nodes point at the file text."""
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    entry = {'version': PARSE_CACHE_VERSION, 'path': os.path.abspath(abs_path), 'fingerprint': parsed.fingerprint,
+             'tree': parsed.tree, 'spans': parsed.spans}
+    if lazy:
+        entry['structs'] = [(node.name, node.modifiers, node.start, node.end) for node in parsed.root.children]
+    else:
+        entry['root'] = parsed.root
+    tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, entry_path)
+
+def _read_with_cache(abs_path, cache_dir, lazy=False):
+    """Reads a file and its cache entry: (content, fingerprint, cached parse or scan, or None)."""
+    content, fingerprint = _read_source(abs_path)
+    entry_path = _cache_entry_path(cache_dir, abs_path, lazy) if cache_dir else None
+    return content, fingerprint, _read_cache_entry(entry_path, abs_path, fingerprint, content)
+
+def load_parsed_file(abs_path, cache_dir=None, lazy=False):
+    """
+    Reads and parses a .cfg file. With a cache_dir, the parsed result is stored as a pickle
+    keyed by path, size, mtime and content hash, so unchanged files skip parsing next time.
+    With lazy=True only top-level struct boundaries are scanned (see scan_cfg); the cache then
+    holds just those boundaries, which are rebuilt over the file text.
+    """
+    content, fingerprint, cached = _read_with_cache(abs_path, cache_dir, lazy)
+    if cached is not None:
+        return ParsedFile(content, *cached, fingerprint)
+
+    parsed = ParsedFile(content, *(_scan_source(content) if lazy else _parse_source(content)), fingerprint)
+    if cache_dir:
+        _write_cache_entry(_cache_entry_path(cache_dir, abs_path, lazy), abs_path, parsed, lazy)
+    return parsed
+
+class DumpRegistry:
+    """
+    Process-wide, read-only store of parsed source files. Each file is read and parsed at
+    most once, however many ModPatchers (or helpers) ask for it.
+    """
+
+    def __init__(self, source_dump_dir, cache_dir=None):
+        self.source_dump = source_dump_dir
+        self.cache_dir = cache_dir
+        self.files = {} # normalized absolute path -> ParsedFile
+
+    def abs_path(self, rel_path):
+        return os.path.normcase(os.path.normpath(os.path.join(self.source_dump, rel_path)))
+
+    def get(self, rel_path, lazy=False):
+        """
+        Returns the ParsedFile for a dump-relative path, or None if it does not exist. lazy=True
+        scans a file that is not loaded yet instead of parsing it; a file loaded either way is
+        shared as is, since lazy structs parse themselves on first access.
+        """
+        abs_path = self.abs_path(rel_path)
+        parsed = self.files.get(abs_path)
+        if parsed is None:
+            if not os.path.exists(abs_path):
+                return None
+            parsed = load_parsed_file(abs_path, self.cache_dir, lazy)
+            self.files[abs_path] = parsed
+        return parsed
+
+    def preload(self, rel_paths, workers=None, lazy=False):
+        """
+        Loads every not-yet-loaded file in rel_paths concurrently: a thread pool reads files and
+        cache entries, a process pool parses the cache misses. workers=None picks one per CPU,
+        workers=1 loads serially. Results land in the registry, so callers see the same data
+        whichever path was taken. lazy=True scans instead of parsing; scans stay in this process,
+        since their nodes keep pointing at the file text.
+        """
+        pending = []
+        seen = set()
+        for rel_path in rel_paths:
+            abs_path = self.abs_path(rel_path)
+            if abs_path not in self.files and abs_path not in seen and os.path.exists(abs_path):
+                seen.add(abs_path)
+                pending.append(abs_path)
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(pending))
+        if workers <= 1:
+            for abs_path in pending:
+                self.files[abs_path] = load_parsed_file(abs_path, self.cache_dir, lazy)
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+            reads = list(pool.map(_read_with_cache, pending, [self.cache_dir] * len(pending), [lazy] * len(pending)))
+
+        misses = [i for i, (_, _, cached) in enumerate(reads) if cached is None]
+        parsed_misses = None
+        if lazy:
+            parsed_misses = [_scan_source(reads[i][0]) for i in misses]
+        elif len(misses) > 1:
+            try:
+                with concurrent.futures.ProcessPoolExecutor(min(workers, len(misses))) as pool:
+                    parsed_misses = list(pool.map(_parse_source, [reads[i][0] for i in misses]))
+            except (OSError, NotImplementedError, concurrent.futures.process.BrokenProcessPool) as e:
+                print(f"Warning: parallel parsing unavailable ({e}), parsing serially.")
+        if parsed_misses is None:
+            parsed_misses = [_parse_source(reads[i][0]) for i in misses]
+        parsed_by_index = dict(zip(misses, parsed_misses))
+
+        # Merge in input order so the registry contents never depend on worker timing
+        for i, abs_path in enumerate(pending):
+            content, fingerprint, cached = reads[i]
+            parsed = ParsedFile(content, *(cached if cached is not None else parsed_by_index[i]), fingerprint)
+            if cached is None and self.cache_dir:
+                _write_cache_entry(_cache_entry_path(self.cache_dir, abs_path, lazy), abs_path, parsed, lazy)
+            self.files[abs_path] = parsed
+
+_registries = {}
+
+def get_dump_registry(source_dump_dir, cache_dir=None):
+    """
+    Returns the shared DumpRegistry for a source dump and parse cache directory, creating it on
+    first use. Callers asking for another cache_dir get their own registry, so it is always honored.
+    """
+    key = (os.path.normcase(os.path.abspath(source_dump_dir)),
+           os.path.normcase(os.path.abspath(cache_dir)) if cache_dir else None)
+    registry = _registries.get(key)
+    if registry is None:
+        registry = DumpRegistry(source_dump_dir, cache_dir)
+        _registries[key] = registry
+    return registry
 
 class ModPatcher:
-    def __init__(self, source_dump_dir, mod_output_dir):
+    def __init__(self, source_dump_dir, mod_output_dir, cache_dir=None, registry=None, load_workers=None,
+                 catalog=None, lazy=False):
         self.source_dump = source_dump_dir
         self.mod_root = mod_output_dir
+        self.load_workers = load_workers # None = one per CPU, 1 = serial
+        self.lazy = lazy # scan top-level structs on load, parse each struct body on first access
+        self.catalog = catalog # optional dump_catalog.DumpCatalog used to find files defining unknown SIDs
+        # Parsed files are shared through the registry; patches stay per patcher
+        self.registry = registry if registry is not None else get_dump_registry(source_dump_dir, cache_dir)
         self.global_tree = {}
         self.file_contents = {}
+        self.file_trees = {} # filename -> parsed root CfgStruct
+        self.span_index = {} # filename -> {struct path: (start, end)}
         self.struct_to_file = {}
         self.filename_to_rel_path = {}
         self.patches = {} # filename -> list of patch strings
+        self.sources = {} # rel_path -> fingerprint of every source file this patcher read
+        self.source_dirs = {} # rel_dir -> sorted entries of every dump directory this patcher listed
+        self.output_files = [] # files written (or found up to date) by save_all
+        self.children_index = {} # parent -> [children], rebuilt by load_files
+        self.refkey_cycles = []
+        self._inheritor_cache = {}
+        self._effective_cache = {} # (rel_path, struct path) -> merged CfgStruct
+        self._effective_deps = {} # (rel_path, struct path) -> rel_paths its effective view was built from
+
+    def load_files(self, relative_paths, workers=None):
+        """
+        Loads and parses files once, builds inheritance tree, and maps structs. With a catalog,
+        the files defining refkey parents that are not loaded yet are loaded too, so resolve
+        never has to load files (and reset the indexes) halfway through a chain.
+        """
+        self._add_files(relative_paths, workers)
+        if self.catalog is not None:
+            asked = set()
+            missing = self._missing_parents()
+            while missing:
+                asked |= missing
+                rel_paths = []
+                for parent in sorted(missing):
+                    found = self.catalog.find_files(parent)
+                    if found and found[0] not in rel_paths:
+                        rel_paths.append(found[0])
+                if not rel_paths:
+                    break
+                self._add_files(rel_paths, workers, replace=False)
+                missing = self._missing_parents() - asked
+        self._rebuild_inheritance_index()
 
-    def load_files(self, relative_paths):
-        """Loads files, builds inheritance tree, and maps structs."""
+    def _add_files(self, relative_paths, workers=None, replace=True):
+        self.registry.preload(relative_paths, workers if workers is not None else self.load_workers, self.lazy)
         for rel_path in relative_paths:
-            abs_path = os.path.join(self.source_dump, rel_path)
-            if not os.path.exists(abs_path):
-                print(f"Warning: {abs_path} not found.")
+            parsed = self.get_source(rel_path)
+            if parsed is None:
+                print(f"Warning: {os.path.join(self.source_dump, rel_path)} not found.")
                 continue
-            
-            filename = os.path.basename(rel_path)
-            tree = get_inheritance_tree(abs_path)
-            self.global_tree.update(tree)
-            
-            with open(abs_path, 'r', encoding='utf-8-sig') as f:
-                content = f.read()
-                self.file_contents[filename] = content
-                self.filename_to_rel_path[filename] = rel_path
-                for struct_name in tree.keys():
-                    self.struct_to_file[struct_name] = (filename, rel_path)
+            self._index_file(rel_path, parsed, replace)
+
+    def _index_file(self, rel_path, parsed, replace=True):
+        """
+        Maps a loaded file's structs. With replace=False SIDs already mapped keep their file, and a file
+        whose basename is already taken by another loaded file is skipped. Returns the SIDs added.
+        """
+        filename = os.path.basename(rel_path)
+        if not replace and self.filename_to_rel_path.get(filename, rel_path) != rel_path:
+            print(f"Warning: not loading {rel_path}: {self.filename_to_rel_path[filename]} is already loaded "
+                  f"under the same file name.")
+            return {}
+        self.file_trees[filename] = parsed.root
+        self.span_index[filename] = parsed.spans
+        self.file_contents[filename] = parsed.content
+        self.filename_to_rel_path[filename] = rel_path
+        added = {}
+        for struct_name, parent in parsed.tree.items():
+            if replace or struct_name not in self.struct_to_file:
+                self.global_tree[struct_name] = parent
+                self.struct_to_file[struct_name] = (filename, rel_path)
+                added[struct_name] = parent
+        return added
+
+    def _missing_parents(self):
+        """refkey parents of loaded SIDs that no loaded file defines."""
+        return {parent for parent in self.global_tree.values() if parent and parent not in self.struct_to_file}
+
+    def get_source(self, rel_path):
+        """Returns the ParsedFile of a dump file (or None) and records it as an input of this patcher."""
+        parsed = self.registry.get(rel_path, self.lazy)
+        if parsed is not None:
+            self.sources[rel_path.replace('\\', '/')] = parsed.fingerprint
+        return parsed
+
+    def list_source_dir(self, rel_dir):
+        """Returns the sorted entry names of a dump directory and records the listing as an input of this patcher."""
+        entries = sorted(os.listdir(os.path.join(self.source_dump, rel_dir)))
+        self.source_dirs[rel_dir.replace('\\', '/')] = entries
+        return entries
+
+    def _rebuild_inheritance_index(self):
+        """Refreshes the reverse refkey index and drops memoized descendant sets after files were added."""
+        self.children_index = build_children_index(self.global_tree)
+        self._inheritor_cache = {}
+        self._effective_cache = {}
+        self._effective_deps = {}
+        known = {frozenset(c) for c in self.refkey_cycles}
+        self.refkey_cycles = find_refkey_cycles(self.global_tree)
+        for cycle in self.refkey_cycles:
+            if frozenset(cycle) not in known:
+                print(f"Warning: refkey loop detected: {' -> '.join(cycle + [cycle[0]])}")
+
+    def get_struct_span(self, filename, path):
+        """Returns the (start, end) offsets of a struct path such as `SID/AIParameters/BehaviorTypes`."""
+        span = self.span_index.get(filename, {}).get(path)
+        if span is None and filename in self.file_trees:
+            # Lazily loaded files only index top-level spans
+            node = self.file_trees[filename].get_path(path)
+            span = (node.start, node.end) if node is not None else None
+        return span
+
+    def get_struct_text(self, filename, path):
+        """Returns the raw text of a struct path as a slice of the file, without a regex search."""
+        span = self.get_struct_span(filename, path)
+        if span is None:
+            return None
+        root = self.file_trees[filename]
+        return StructText.wrap(self.file_contents[filename].source, root.get_path(path), root, span)
 
     def get_all_inheritors(self, base_struct):
-        inheritors = find_all_inheritors(self.global_tree, base_struct)
-        inheritors.add(base_struct)
-        return sorted(list(inheritors))
+        """Returns base_struct and every struct inheriting from it, sorted. Memoized until the next load_files."""
+        cached = self._inheritor_cache.get(base_struct)
+        if cached is None:
+            inheritors = find_all_inheritors(self.global_tree, base_struct, self.children_index)
+            inheritors.add(base_struct)
+            cached = tuple(sorted(inheritors))
+            self._inheritor_cache[base_struct] = cached
+        return list(cached)
 
-    def add_patch(self, filename, patch_text):
+    def get_ancestors(self, struct_name):
+        """Returns struct_name followed by its refkey parents, nearest first, stopping at the root or a loop."""
+        chain = [struct_name]
+        seen = {struct_name}
+        parent = self.global_tree.get(struct_name)
+        while parent and parent not in seen:
+            chain.append(parent)
+            seen.add(parent)
+            parent = self.global_tree.get(parent)
+        return chain
+
+    def get_top_level_structs(self, filename):
+        """Returns the SIDs defined at the top level of a loaded file, in file order."""
+        root = self.file_trees.get(filename)
+        if root is None:
+            return []
+        return [node.name for node in root.children if _SID_RE.fullmatch(node.name)]
+
+    def load_struct(self, struct_name):
+        """Makes sure the file defining struct_name is loaded, asking the catalog which one it is. Returns its node."""
+        if struct_name not in self.struct_to_file and self.catalog is not None:
+            rel_paths = self.catalog.find_files(struct_name)
+            if rel_paths:
+                self.load_files(rel_paths[:1])
+        return self.get_struct(struct_name)
+
+    def get_struct(self, struct_name):
+        """Returns the struct's own parsed node (no inheritance applied), or None if it is not loaded."""
+        mapping = self.struct_to_file.get(struct_name)
+        if not mapping:
+            return None
+        return self.file_trees[mapping[0]].get_path(struct_name)
+
+    def resolve(self, struct_name):
+        """
+        Returns the effective view of a SID: its own struct merged over everything it inherits
+        through refkey (and cross-file refurl) references. Each struct is resolved once, parents
+        first, and memoized until the next load_files.
+        """
+        mapping = self.struct_to_file.get(struct_name)
+        if not mapping:
+            return None
+        return self._resolve_node(mapping[1], self.get_struct(struct_name), set())
+
+    def resolve_node(self, rel_path, node, dependencies=None):
+        """
+        Like resolve(), for a top-level node of a given dump file rather than whichever file last
+        defined its SID. Pass a set as dependencies to collect the rel_paths the view was built from.
+        """
+        effective = self._resolve_node(rel_path, node, set())
+        if dependencies is not None:
+            dependencies.update(self._effective_deps.get((rel_path, node.path), (rel_path,)))
+        return effective
+
+    def get_effective_value(self, struct_name, key, node_path=None, deep=False):
+        """Returns the inherited value of `key` on a SID, optionally inside a nested path such as ["CombatParameters"]."""
+        effective = self.resolve(struct_name)
+        node = effective.find_path(node_path) if effective is not None and node_path else effective
+        return node.get(key, deep=deep) if node is not None else None
+
+    def _resolve_node(self, rel_path, node, resolving):
+        key = (rel_path, node.path)
+        cached = self._effective_cache.get(key)
+        if cached is not None:
+            return cached
+        if key in resolving:
+            return node # refkey loop, already reported by load_files
+
+        resolving.add(key)
+        parent = self._find_parent(rel_path, node)
+        if parent is not None and parent[1] is node:
+            parent = None
+        effective = merge_structs(self._resolve_node(parent[0], parent[1], resolving), node) if parent else node
+        resolving.discard(key)
+        self._effective_cache[key] = effective
+        deps = {rel_path}
+        if parent:
+            deps.update(self._effective_deps.get((parent[0], parent[1].path), (parent[0],)))
+        self._effective_deps[key] = frozenset(deps)
+        return effective
+
+    def _find_parent(self, rel_path, node):
+        """Locates the struct a node inherits from as (rel_path, node), following refurl into other dump files."""
+        refkey = node.refkey
+        if not isinstance(refkey, str):
+            return None
+
+        refurl = node.refurl
+        if isinstance(refurl, str):
+            target_rel = os.path.normpath(os.path.join(os.path.dirname(rel_path), refurl))
+            parsed = self.get_source(target_rel)
+            return self._lookup_struct(target_rel, parsed.root, refkey) if parsed else None
+
+        # Same file first, then any other loaded file that defines the SID
+        parsed = self.get_source(rel_path)
+        found = self._lookup_struct(rel_path, parsed.root, refkey) if parsed else None
+        if found is None:
+            if _SID_RE.fullmatch(refkey) and refkey not in self.struct_to_file:
+                self._load_parent_file(refkey)
+            mapping = self.struct_to_file.get(refkey)
+            if mapping:
+                found = self._lookup_struct(mapping[1], self.file_trees[mapping[0]], refkey)
+        return found
+
+    def _load_parent_file(self, sid):
+        """
+        Fallback for a parent load_files could not prefetch, e.g. one reached through a refurl file:
+        indexes the single file the catalog names without a rebuild, so views resolved so far stay valid.
+        """
+        if self.catalog is None:
+            return
+        rel_paths = self.catalog.find_files(sid)
+        parsed = self.get_source(rel_paths[0]) if rel_paths else None
+        if parsed is None:
+            return
+        for struct_name, parent in self._index_file(rel_paths[0], parsed, replace=False).items():
+            if parent:
+                self.children_index.setdefault(parent, []).append(struct_name)
+        self._inheritor_cache = {}
+
+    @staticmethod
+    def _lookup_struct(rel_path, root, refkey):
+        """Finds a top-level struct by SID or by `[n]` position."""
+        if refkey.startswith('[') and refkey.endswith(']'):
+            try:
+                found = root.children[int(refkey[1:-1])]
+            except (ValueError, IndexError):
+                return None
+        else:
+            found = root.get_path(refkey)
+        return (rel_path, found) if found is not None else None
+
+    def add_patch(self, filename, patch):
+        """Queues a BPatch (or already rendered patch text) for a source file."""
         if filename not in self.patches:
             self.patches[filename] = []
-        self.patches[filename].append(patch_text)
+        self.patches[filename].append(patch)
+
+    def prune_noops(self, filename, patches, assigned=None):
+        """
+        Drops properties from the bpatches of one file that set the value the struct already has
+        (after numeric normalization), then blocks left empty. An assignment is only dropped if
+        the struct defines that key itself, or no refkey ancestor is patched at the same key, since
+        otherwise it pins the value against the ancestor's patch. Returns (patches, nodes removed).
+        """
+        if assigned is None:
+            assigned = self._assigned_keys()
+        kept = []
+        removed = 0
+        for patch in patches:
+            if isinstance(patch, BPatch) and patch.bpatch and self.struct_to_file.get(patch.name, (None,))[0] == filename:
+                removed += patch.prune(lambda path, key, value, sid=patch.name:
+                                       not self._is_noop(sid, path, key, value, assigned))
+                if patch.is_empty():
+                    removed += 1
+                    continue
+            kept.append(patch)
+        return kept, removed
+
+    def _assigned_keys(self):
+        """Every (SID, lowercased path, lowercased key) some queued bpatch of this patcher sets."""
+        assigned = set()
+        for patches in self.patches.values():
+            for patch in patches:
+                if isinstance(patch, BPatch):
+                    for path, key in patch.assignments():
+                        assigned.add((patch.name, tuple(n.lower() for n in path), key.lower()))
+        return assigned
+
+    @staticmethod
+    def _node_at(node, path):
+        for name in path:
+            if node is None:
+                return None
+            node = node.child(name)
+        return node
+
+    def _is_noop(self, sid, path, key, value, assigned):
+        effective = self._node_at(self.resolve(sid), path)
+        original = effective.get(key) if effective is not None else None
+        if original is None or not same_cfg_value(value, original):
+            return False
+        own = self._node_at(self.get_struct(sid), path)
+        if own is not None and own.get(key) is not None:
+            return True
+        lowered = (tuple(n.lower() for n in path), key.lower())
+        return not any((ancestor, *lowered) in assigned for ancestor in self.get_ancestors(sid)[1:])
 
-    def save_all(self, mod_name_suffix):
+    def save_all(self, mod_name_suffix, prune_noops=True):
         if not self.patches:
             print("No patches generated.")
             return
 
+        assigned = self._assigned_keys() if prune_noops else None
+        written = skipped = 0
+
         for filename, patches in self.patches.items():
             base_name = os.path.splitext(filename)[0]
             
@@ -223,10 +1528,32 @@ class ModPatcher:
             rel_dir = os.path.dirname(rel_path) if rel_path else ""
             
             target_dir = os.path.join(self.mod_root, rel_dir, base_name)
-            os.makedirs(target_dir, exist_ok=True)
-            
             target_file = os.path.join(target_dir, f"{base_name}_patch_{mod_name_suffix}.cfg")
-            print(f"Writing {len(patches)} patches to {target_file}...")
-            with open(target_file, 'w', encoding='utf-8') as f:
-                f.write("\n\n".join(patches))
-        print("Success.")
+            queued = len(patches)
+            patches, conflicts = coalesce_patches(patches)
+            if len(patches) < queued:
+                print(f"DEBUG: Coalesced {queued} patches into {len(patches)} blocks for {filename}.")
+            for path, key, old, new in conflicts:
+                print(f"Warning: {filename}: {path}/{key} is set to both {old} and {new}; keeping {new}.")
+            if prune_noops:
+                size = len(render_patches(patches))
+                patches, removed = self.prune_noops(filename, patches, assigned)
+                if removed:
+                    print(f"DEBUG: Pruned {removed} no-op nodes ({size - len(render_patches(patches))} bytes) from {filename}.")
+            if not patches:
+                # A file left by an earlier run would still be packed into the mod
+                if os.path.exists(target_file):
+                    os.remove(target_file)
+                    print(f"DEBUG: Every patch for {filename} was a no-op, removed {target_file}.")
+                else:
+                    print(f"DEBUG: Every patch for {filename} was a no-op, nothing to write.")
+                continue
+            os.makedirs(target_dir, exist_ok=True)
+            self.output_files.append(target_file)
+            if write_file_if_changed(target_file, render_patches(patches)):
+                print(f"Writing {len(patches)} patches to {target_file}...")
+                written += 1
+            else:
+                print(f"Unchanged: {target_file}")
+                skipped += 1
+        print(f"Success. {written} files written, {skipped} unchanged.")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The patcher modules are imported from src, the way the scripts run them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
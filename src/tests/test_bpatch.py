@@ -0,0 +1,55 @@
+import patching_script_general as psg
+
+# What the text-building generate_bpatch produced before BPatch existed
+EXPECTED = """GuardRifle : struct.begin {bpatch}
+   Cost = 1200
+   AIParameters : struct.begin {bpatch}
+      BehaviorTypes : struct.begin {bpatch}
+         Master : struct.begin
+            MinShots = 3
+            Dispersion = 1.5f
+            [*] = Alpha
+            [*] = Beta
+         struct.end
+      struct.end
+   struct.end
+struct.end"""
+
+def test_generate_bpatch_matches_baseline_text():
+    text = psg.generate_bpatch("GuardRifle", ["AIParameters", "BehaviorTypes", "Master : struct.begin"],
+                               ["Alpha", "[*] = Beta"], {"MinShots": 3, "Dispersion": "1.5f"}, {"Cost": 1200})
+    assert text == EXPECTED
+
+def test_built_bpatch_renders_baseline_text():
+    patch = psg.BPatch("GuardRifle")
+    patch.set("Cost", 1200)
+    master = patch.node("AIParameters").node("BehaviorTypes").node("Master", bpatch=False)
+    master.set("MinShots", 2)
+    master.set("Dispersion", "1.5f")
+    master.add_item("Alpha")
+    master.add_item("Beta")
+    master.set("MinShots", 3) # replaced in place, keeping its position
+    assert patch.render() == EXPECTED
+    assert psg.render_patches([patch, "Raw : struct.begin\nstruct.end"]) == EXPECTED + "\n\nRaw : struct.begin\nstruct.end"
+
+def test_coalesce_patches_merges_blocks_for_one_sid():
+    first = psg.BPatch("GuardRifle")
+    first.set("Cost", 1200)
+    first.set("Weight", 3)
+    first.node("AIParameters").set("Range", 40)
+    second = psg.BPatch("GuardRifle")
+    second.set("Speed", 2)
+    second.set("Cost", 1500)
+    second.node("AIParameters").set("Range", 40)
+    other = psg.BPatch("Pistol")
+    other.set("Cost", 300)
+
+    patches, conflicts = psg.coalesce_patches([first, other, "Raw : struct.begin\nstruct.end", second])
+    assert [p.name if isinstance(p, psg.BPatch) else p for p in patches] == \
+        ["GuardRifle", "Pistol", "Raw : struct.begin\nstruct.end"]
+    merged = patches[0]
+    assert merged.properties == [("Cost", "1500"), ("Weight", "3"), ("Speed", "2")]
+    assert merged.node("AIParameters").properties == [("Range", "40")]
+    assert conflicts == [("GuardRifle", "Cost", "1200", "1500")]
+    # The inputs are copied, never changed
+    assert first.properties == [("Cost", "1200"), ("Weight", "3")]
@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+from patching.lrc.bursts import BurstMatrix, BRACKETS, DEFAULT_RANK_CONFIG, compute_bracket
+from patching.lrc.constants import RANK_CONFIGS
+
+np = pytest.importorskip("numpy")
+
+def random_rows(count, seed):
+    """Random compute_bracket inputs over every rank config (plus an unknown rank), bracket and weapon class."""
+    rng = random.Random(seed)
+    ranks = list(RANK_CONFIGS) + ["Unknown"]
+    rows = []
+    for _ in range(count):
+        t = rng.choice(ranks)
+        is_shotgun = rng.random() < 0.15
+        is_sniper = not is_shotgun and rng.random() < 0.25
+        rows.append((t, rng.choice(BRACKETS), RANK_CONFIGS.get(t, DEFAULT_RANK_CONFIG), rng.randint(0, 20),
+                     rng.randint(0, 20), rng.randint(0, 4), rng.choice([1, 2, 5, 8, 20, 30, 45, 100]),
+                     rng.choice([50.0, 159.9, 160.0, 500.0]), is_sniper, is_shotgun))
+    return rows
+
+@pytest.mark.parametrize("seed", range(5))
+def test_vectorized_matches_scalar(seed):
+    rows = random_rows(20000, seed)
+    matrix = BurstMatrix()
+    for row in rows:
+        matrix.add_row(*row)
+    vectorized = matrix.compute_vectorized()
+    for row, result in zip(rows, vectorized):
+        assert result == compute_bracket(*row), row
+    assert len(vectorized) == len(rows)
+
+def test_compute_matches_both_paths():
+    rows = random_rows(100, 0)
+    matrix = BurstMatrix()
+    for row in rows:
+        matrix.add_row(*row)
+    assert matrix.compute() == matrix.compute_vectorized() == matrix.compute_scalar()
@@ -0,0 +1,60 @@
+import io
+
+from compare_configs import parse_weapons_attributes
+
+ATTRIBUTES = """GuardRifle : struct.begin {refkey=[0]}
+   SID = GuardRifle
+   AIParameters : struct.begin
+      BehaviorTypes : struct.begin
+         Newbie : struct.begin
+            Short : struct.begin
+               MinShots = 2
+               MaxShots = 4
+               IgnoreDispersionMinShots = 1
+            struct.end
+            Long : struct.begin struct.end
+         struct.end
+         Master : struct.begin
+            Medium : struct.begin
+               MaxShots = 9
+               MaxShots = 10
+            struct.end
+         struct.end
+         Master : struct.begin
+            Short : struct.begin
+               MinShots = 99
+            struct.end
+         struct.end
+      struct.end
+   struct.end
+struct.end
+NoBehavior : struct.begin
+   SID = NoBehavior
+struct.end
+GuardRifle : struct.begin
+   BehaviorTypes : struct.begin
+      Newbie : struct.begin
+         Short : struct.begin
+            MinShots = 77
+         struct.end
+      struct.end
+   struct.end
+struct.end
+"""
+
+def test_parse_weapons_attributes():
+    results = parse_weapons_attributes(io.StringIO(ATTRIBUTES))
+    assert list(results) == ["GuardRifle", "NoBehavior"]
+    assert results["NoBehavior"] == {}
+
+    rifle = results["GuardRifle"]
+    assert list(rifle) == ["Newbie", "Experienced", "Veteran", "Master", "Zombie"]
+    assert rifle["Experienced"] == {} and rifle["Zombie"] == {}
+    assert rifle["Newbie"] == {
+        "Short": {"MinShots": 2, "MaxShots": 4, "IgnoreDispersionMinShots": 1, "IgnoreDispersionMaxShots": None},
+        "Medium": {},
+        "Long": {"MinShots": None, "MaxShots": None, "IgnoreDispersionMinShots": None, "IgnoreDispersionMaxShots": None},
+    }
+    # Only the first Master block and the first MaxShots count
+    assert rifle["Master"]["Short"] == {}
+    assert rifle["Master"]["Medium"]["MaxShots"] == 9
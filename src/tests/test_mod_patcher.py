@@ -0,0 +1,26 @@
+import patching_script_general as psg
+from dump_catalog import DumpCatalog, GAMEDATA_REL
+
+CHILD_PATH = GAMEDATA_REL + '/Items/Things.cfg'
+BASE_PATH = GAMEDATA_REL + '/Shared/Things.cfg'
+
+def write_dump(tmp_path):
+    dump = tmp_path / "dump"
+    for rel_path, text in ((CHILD_PATH, "Child : struct.begin {refkey=Base}\n   Value = 2\nstruct.end\n"),
+                           (BASE_PATH, "Base : struct.begin\n   Value = 1\n   Other = 3\nstruct.end\n")):
+        (dump / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (dump / rel_path).write_text(text)
+    catalog = DumpCatalog(str(tmp_path / "catalog.db"))
+    catalog.index_dump(str(dump))
+    return str(dump), catalog
+
+def test_catalog_prefetch_keeps_loaded_file_on_basename_clash(tmp_path, capsys):
+    dump, catalog = write_dump(tmp_path)
+    patcher = psg.ModPatcher(dump, None, registry=psg.DumpRegistry(dump), catalog=catalog)
+    patcher.load_files([CHILD_PATH])
+    assert "Warning: not loading " + BASE_PATH in capsys.readouterr().out
+    assert patcher.filename_to_rel_path["Things.cfg"] == CHILD_PATH
+    assert patcher.file_trees["Things.cfg"].children[0].name == "Child"
+    assert patcher.struct_to_file["Child"] == ("Things.cfg", CHILD_PATH)
+    assert "Base" not in patcher.struct_to_file
+    catalog.close()
@@ -0,0 +1,115 @@
+import io
+
+import patching_script_general as psg
+
+SAMPLE = """// Header comment
+Base : struct.begin
+   SID = Base
+   Health = 100
+   Speed = 1.5f
+   Enabled = true
+   Bone = EDamageBone::Head
+   Tags : struct.begin
+      [*] = Alpha
+      [*] = Beta
+   struct.end
+   Coefs : struct.begin
+      [*] : struct.begin
+         DamageCoef = 2.0 // trailing comment
+      struct.end
+   struct.end
+struct.end
+Child : struct.begin {refkey=Base}
+   SID = Child
+   Empty : struct.begin struct.end
+   Health = 50%
+struct.end
+"""
+
+def test_parse_cfg_builds_tree():
+    root = psg.parse_cfg(SAMPLE)
+    base, child = root.children
+    assert (base.name, child.name, child.refkey) == ("Base", "Child", "Base")
+    assert base.get("Health") == 100 and base.get("Speed") == 1.5 and base.get("Enabled") is True
+    assert base.get("bone") == "EDamageBone::Head"
+    assert child.get("Health") == 0.5
+    assert base.get_path("Tags").items == ["Alpha", "Beta"]
+    assert base.get_path("Coefs").children[0].get("DamageCoef") == 2.0
+    assert SAMPLE[base.start:base.end].startswith("Base : struct.begin")
+    assert SAMPLE[base.start:base.end].endswith("struct.end")
+    assert child.get_path("Empty").children == []
+    assert psg.build_inheritance_tree(root) == {"Base": None, "Child": "Base"}
+
+def test_iter_cfg_events_matches_tree():
+    events = list(psg.iter_cfg_events(io.StringIO(SAMPLE)))
+    begins = [(e.name, e.depth) for e in events if e.kind == 'struct_begin']
+    assert begins == [("Base", 0), ("Tags", 1), ("Coefs", 1), ("[*]", 2), ("Child", 0), ("Empty", 1)]
+    assert sum(e.kind == 'struct_end' for e in events) == len(begins)
+    root = psg.parse_cfg(SAMPLE)
+    ends = [e.end for e in events if e.kind == 'struct_end' and e.depth == 0]
+    assert ends == [node.end for node in root.children]
+
+def test_parse_cfg_offset_shifts_spans():
+    root = psg.parse_cfg(SAMPLE, 1000)
+    assert [n.start for n in root.children] == [n.start + 1000 for n in psg.parse_cfg(SAMPLE).children]
+
+def snapshot(node):
+    """Everything a parsed node holds, recursively, as plain values."""
+    return (node.name, dict(node.modifiers), node.start, node.end, node.properties, list(node.items),
+            [snapshot(child) for child in node.children])
+
+def write_sample(tmp_path):
+    path = tmp_path / "Sample.cfg"
+    path.write_text(SAMPLE)
+    return str(path)
+
+def test_cache_hit_matches_cache_miss(tmp_path):
+    path = write_sample(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    miss = psg.load_parsed_file(path, cache_dir)
+    hit = psg.load_parsed_file(path, cache_dir)
+    assert hit.root is not miss.root
+    assert snapshot(hit.root) == snapshot(miss.root)
+    assert (hit.tree, hit.spans, hit.fingerprint) == (miss.tree, miss.spans, miss.fingerprint)
+
+def test_unreadable_cache_entry_is_a_miss(tmp_path):
+    path = write_sample(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    expected = snapshot(psg.load_parsed_file(path, cache_dir).root)
+    # A pickle naming a module that does not exist, as after a code move
+    with open(psg._cache_entry_path(cache_dir, path), 'wb') as f:
+        f.write(b"cno_such_module\nThing\n.")
+    assert snapshot(psg.load_parsed_file(path, cache_dir).root) == expected
+
+def test_patchers_share_file_text(tmp_path):
+    (tmp_path / "Sample.cfg").write_text(SAMPLE)
+    registry = psg.DumpRegistry(str(tmp_path))
+    first, second = [psg.ModPatcher(str(tmp_path), None, registry=registry, lazy=True) for _ in range(2)]
+    for patcher in (first, second):
+        patcher.load_files(["Sample.cfg"])
+    assert first.file_contents["Sample.cfg"] is second.file_contents["Sample.cfg"]
+    assert psg.get_value(psg.get_struct_content(first.file_contents["Sample.cfg"], "Child"), "Health") == 0.5
+
+def test_iter_top_level_structs_matches_parse_cfg():
+    text = SAMPLE + "Base : struct.begin\n   Health = 1\nstruct.end\n"
+    full = psg.parse_cfg(text)
+    streamed = list(psg.iter_top_level_structs(io.StringIO(text)))
+    assert [snapshot(node) for node in streamed] == [snapshot(node) for node in full.children]
+
+def test_lazy_parse_matches_full_parse(tmp_path):
+    path = write_sample(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    full = snapshot(psg.parse_cfg(SAMPLE))
+    assert snapshot(psg.scan_cfg(SAMPLE)) == full
+    for _ in range(2): # a cache miss, then a hit
+        assert snapshot(psg.load_parsed_file(path, cache_dir, lazy=True).root) == full
+
+def test_struct_lookup_leaves_other_lazy_structs_unparsed(tmp_path):
+    content = psg.load_parsed_file(write_sample(tmp_path), lazy=True).content
+    base, child = content.root.children
+    assert psg.get_struct_content(content, "Child").node is child
+    # Tags is nested in Base: a lookup from the file root does not search inside lazy structs
+    assert psg.get_struct_content(content, "Tags") is None
+    assert not psg.has_nested_node(content, "Tags", [])
+    assert base._source is not None
+    assert psg.get_struct_content(psg.get_struct_content(content, "Base"), "[*]").node.get("DamageCoef") == 2.0
@@ -0,0 +1,42 @@
+import types
+
+import pytest
+
+import patch_all
+import patch_config
+
+def fake_mod(tmp_path, name, calls, fails=False):
+    """A mod package stand-in whose run() records the call and returns an empty patcher."""
+    module = types.ModuleType(name)
+    module.__file__ = str(tmp_path / name / "__init__.py")
+    def run():
+        calls.append(name)
+        if fails:
+            raise RuntimeError(f"{name} broke")
+        return types.SimpleNamespace(sources={}, output_files=[], source_dirs={})
+    module.run = run
+    return module
+
+@pytest.fixture
+def mods(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(patch_config, "MODS_DATA_ROOT", str(tmp_path / "mods"))
+    monkeypatch.setattr(patch_all, "MODS", {
+        "First": fake_mod(tmp_path, "first", calls, fails=True),
+        "Second": fake_mod(tmp_path, "second", calls),
+    })
+    return calls
+
+def test_failing_mod_does_not_stop_a_serial_run(mods, capsys):
+    assert patch_all.main(["-j", "1"]) == 1
+    assert mods == ["first", "second"]
+    out = capsys.readouterr().out
+    assert "RuntimeError: first broke" in out and "Patching finished with errors." in out
+
+def test_serial_fallback_reports_failures(mods, monkeypatch, capsys):
+    def no_pool(jobs):
+        raise OSError("no processes here")
+    monkeypatch.setattr(patch_all.concurrent.futures, "ProcessPoolExecutor", no_pool)
+    assert patch_all.main(["-j", "2"]) == 1
+    assert mods == ["first", "second"]
+    assert "running the remaining mods serially" in capsys.readouterr().out
@@ -0,0 +1,25 @@
+from patch_manifest import build_manifest, stale_reason
+
+def test_stale_when_listed_directory_changes(tmp_path):
+    dump = tmp_path / "dump"
+    (dump / "ObjPrototypes").mkdir(parents=True)
+    (dump / "ObjPrototypes" / "A.cfg").write_text("")
+    manifest = build_manifest({}, {}, str(dump), {}, str(tmp_path), [], {"ObjPrototypes": ["A.cfg"]})
+    assert stale_reason(manifest, {}, {}, str(dump), str(tmp_path)) is None
+
+    (dump / "ObjPrototypes" / "B.cfg").write_text("")
+    assert stale_reason(manifest, {}, {}, str(dump), str(tmp_path)) == "files added to or removed from ObjPrototypes"
+
+def test_stale_when_catalog_is_built_or_rebuilt(tmp_path):
+    catalog_db = tmp_path / "catalog.sqlite"
+    config = {'catalog_db': str(catalog_db)}
+    manifest = build_manifest({}, config, str(tmp_path), {}, str(tmp_path), [])
+    assert stale_reason(manifest, {}, config, str(tmp_path), str(tmp_path)) is None
+
+    catalog_db.write_bytes(b"first build")
+    assert stale_reason(manifest, {}, config, str(tmp_path), str(tmp_path)) == "catalog built"
+
+    manifest = build_manifest({}, config, str(tmp_path), {}, str(tmp_path), [])
+    assert stale_reason(manifest, {}, config, str(tmp_path), str(tmp_path)) is None
+    catalog_db.write_bytes(b"second build")
+    assert stale_reason(manifest, {}, config, str(tmp_path), str(tmp_path)) == "catalog changed"
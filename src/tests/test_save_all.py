@@ -0,0 +1,55 @@
+import pytest
+
+import patching_script_general as psg
+
+REL_PATH = 'Content/GameLite/GameData/Test/TestPrototypes.cfg'
+SOURCE = "Thing : struct.begin\n   SID = Thing\n   Value = 1\nstruct.end\n"
+
+def write_dump(tmp_path):
+    source_path = tmp_path / "dump" / REL_PATH
+    source_path.parent.mkdir(parents=True)
+    source_path.write_text(SOURCE)
+
+def patch_value(tmp_path, value):
+    """Runs a patcher that sets Thing.Value and saves it; returns the patcher."""
+    dump = str(tmp_path / "dump")
+    patcher = psg.ModPatcher(dump, str(tmp_path / "mod"), registry=psg.DumpRegistry(dump))
+    patcher.load_files([REL_PATH])
+    patch = psg.BPatch("Thing")
+    patch.set("Value", value)
+    patcher.add_patch("TestPrototypes.cfg", patch)
+    patcher.save_all("Test")
+    return patcher
+
+def target_file(tmp_path):
+    return tmp_path / "mod" / "Content/GameLite/GameData/Test/TestPrototypes/TestPrototypes_patch_Test.cfg"
+
+def test_save_all_writes_patch(tmp_path):
+    write_dump(tmp_path)
+    patcher = patch_value(tmp_path, 2)
+    assert "Value = 2" in target_file(tmp_path).read_text()
+    assert patcher.output_files == [str(target_file(tmp_path))]
+
+def test_save_all_removes_previous_output_when_every_patch_is_a_noop(tmp_path):
+    write_dump(tmp_path)
+    patch_value(tmp_path, 2)
+    assert target_file(tmp_path).exists()
+
+    patcher = patch_value(tmp_path, 1)
+    assert not target_file(tmp_path).exists()
+    assert patcher.output_files == []
+
+def test_write_file_if_changed_leaves_no_temp_file_on_failure(tmp_path, monkeypatch):
+    path = tmp_path / "out.cfg"
+    def fail(src, dst):
+        raise OSError("replace failed")
+    monkeypatch.setattr(psg.os, "replace", fail)
+    with pytest.raises(OSError):
+        psg.write_file_if_changed(str(path), "X = 1\n")
+    assert list(tmp_path.iterdir()) == []
+
+def test_write_file_if_changed_skips_identical_content(tmp_path):
+    path = tmp_path / "out.cfg"
+    assert psg.write_file_if_changed(str(path), "X = 1\n")
+    assert not psg.write_file_if_changed(str(path), "X = 1\n")
+    assert psg.write_file_if_changed(str(path), "X = 2\n")
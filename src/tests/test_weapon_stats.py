@@ -0,0 +1,54 @@
+import patching_script_general as psg
+from patching.lrc.utils import WEAPON_SETUP_PATH, load_weapon_stats_map
+
+TEMPLATES_PATH = 'Content/GameLite/GameData/WeaponData/WeaponTemplates.cfg'
+SETUP = """Gun_AR : struct.begin {refurl=WeaponTemplates.cfg; refkey=TemplateWeapon}
+   SID = Gun_AR
+   FirstShotDispersionRadius = 150.0
+   AimingEffects : struct.begin
+      MaxAmmo = 999
+   struct.end
+struct.end
+Gun_Sniper : struct.begin {refkey=Gun_AR}
+   SID = Gun_Sniper
+   MaxAmmo = 8
+struct.end
+"""
+TEMPLATE = "TemplateWeapon : struct.begin\n   SID = TemplateWeapon\n   MaxAmmo = {ammo}\n   RecoilRadius = 1.0\nstruct.end\n"
+
+def write_dump(tmp_path, ammo):
+    (tmp_path / WEAPON_SETUP_PATH).parent.mkdir(parents=True, exist_ok=True)
+    (tmp_path / WEAPON_SETUP_PATH).write_text(SETUP)
+    (tmp_path / TEMPLATES_PATH).write_text(TEMPLATE.format(ammo=ammo))
+
+def load_stats(tmp_path, registry=None, files=()):
+    registry = registry if registry is not None else psg.DumpRegistry(str(tmp_path))
+    patcher = psg.ModPatcher(str(tmp_path), None, registry=registry)
+    patcher.load_files(list(files))
+    return patcher, load_weapon_stats_map(patcher)
+
+def test_stats_are_inherited_and_scoped(tmp_path):
+    write_dump(tmp_path, 30)
+    patcher, stats = load_stats(tmp_path)
+    assert stats["Gun_AR"] == {"MaxAmmo": 30, "RecoilRadius": 1.0, "FirstShotDispersionRadius": 150.0}
+    assert stats["Gun_Sniper"] == {"MaxAmmo": 8, "RecoilRadius": 1.0, "FirstShotDispersionRadius": 150.0}
+    assert set(patcher.sources) == {WEAPON_SETUP_PATH, TEMPLATES_PATH}
+
+def test_cache_is_shared_per_registry_and_loaded_files(tmp_path):
+    write_dump(tmp_path, 30)
+    registry = psg.DumpRegistry(str(tmp_path))
+    _, first = load_stats(tmp_path, registry)
+    patcher, again = load_stats(tmp_path, registry)
+    assert again is first
+    # A cache hit still records the inherited file for the patch manifest
+    assert set(patcher.sources) == {WEAPON_SETUP_PATH, TEMPLATES_PATH}
+
+    _, other_files = load_stats(tmp_path, registry, [TEMPLATES_PATH])
+    assert other_files is not first and other_files == first
+
+def test_new_registry_sees_changed_files(tmp_path):
+    write_dump(tmp_path, 30)
+    _, first = load_stats(tmp_path)
+    write_dump(tmp_path, 45)
+    _, changed = load_stats(tmp_path)
+    assert (first["Gun_AR"]["MaxAmmo"], changed["Gun_AR"]["MaxAmmo"]) == (30, 45)
@@ -1,6 +1,7 @@
 import os
 import sys
 import re
+from patching_script_general import iter_cfg_events
 
 # Default source dump path for validation
 SOURCE_DUMP = r'C:\dev\stalker2\cfg_dump_1-8-1\Stalker2\Content\GameLite\GameData'
@@ -37,7 +38,11 @@ def validate_mod(mod_path, source_dump=SOURCE_DUMP):
                 print(f"Skipping (not in GameData): {full_path}")
                 continue
 
-            # 2. Type Detection & Rule Validation
+            # 2. Structure: every struct.begin needs a matching struct.end
+            if not check_structure(full_path):
+                errors += 1
+
+            # 3. Type Detection & Rule Validation
             # Rule A: Standard/Global Patch (OriginalFileName.cfg_patch_YourModName)
             if ".cfg_patch_" in file:
                 original_filename = file.split(".cfg_patch_")[0] + ".cfg"
@@ -75,6 +80,20 @@ def validate_mod(mod_path, source_dump=SOURCE_DUMP):
     print(f"\nScan complete. Files found: {total_files}, Errors: {errors}")
     return errors == 0
 
+def check_structure(patch_full_path):
+    """Streams a patch file and reports unbalanced struct.begin / struct.end markers."""
+    problems = []
+    with open(patch_full_path, 'r', encoding='utf-8-sig') as f:
+        for event in iter_cfg_events(f):
+            if event.kind == 'stray_end':
+                problems.append(f"struct.end without an open struct at offset {event.start}")
+            elif event.kind == 'struct_end' and not event.value:
+                problems.append(f"'{event.name}' is never closed")
+    for problem in problems:
+        print(f"[FAIL] Structure Error: {os.path.basename(patch_full_path)}")
+        print(f"      {problem}")
+    return not problems
+
 def check_original_exists(source_dump, rel_path, patch_full_path, patch_type):
     """Verifies the base file exists in the source dump."""
     original_full_path = os.path.join(source_dump, rel_path.replace('/', os.sep))